@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Measure how responsive QuickBibWindow stays while fetches run.
+
+Runs headless (Qt offscreen platform) against a stub backend, so it works on
+a CI machine without a display or network. Measured:
+
+* event-loop stalls - lateness of a 5 ms heartbeat timer while fetches run,
+* fetch to paint - from pressing Fetch until the result is painted,
+* result to paint - from a large result reaching ``on_fetch_finished``
+  until it is painted, and the time spent inside the slot,
+* memory growth per fetch - tracemalloc and RSS over a run of fetches.
+
+Usage::
+
+    python3 benchmarks/gui_responsiveness.py -o current.json
+    python3 benchmarks/gui_responsiveness.py --baseline baseline.json
+
+With ``--baseline``, any metric more than ``--tolerance`` worse than the
+baseline is listed under ``regressions`` and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import harness
+from PyQt6.QtCore import QEvent, QObject, Qt, QTimer, PYQT_VERSION_STR, QT_VERSION_STR
+
+HEARTBEAT_MS = 5
+RESULT_SIZES = (10_000, 100_000, 1_000_000)
+# Differences below these are noise, whatever the relative change
+ABSOLUTE_FLOOR = {"ms": 2.0, "bytes": 4096}
+# Sample counts are not timings, and a single worst case is too noisy to gate on
+_NOT_COMPARED = ("count", "fetches", ".max")
+
+
+class Heartbeat(QObject):
+    """Records how late a fast repeating timer fires: the event-loop stalls."""
+
+    def __init__(self, interval_ms=HEARTBEAT_MS):
+        super().__init__()
+        self.interval = interval_ms / 1000.0
+        self.stalls = []
+        self._last = None
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.stalls.append(max(0.0, now - self._last - self.interval))
+        self._last = now
+
+    def start(self):
+        # Measured from now, so a stall before the first tick counts too
+        self._last = time.perf_counter()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+
+class PaintProbe(QObject):
+    """Time from :meth:`mark` to the next paint of the watched widget."""
+
+    def __init__(self, widget):
+        super().__init__()
+        self.latencies = []
+        self._marked = None
+        widget.installEventFilter(self)
+
+    def mark(self):
+        self._marked = time.perf_counter()
+
+    @property
+    def waiting(self):
+        return self._marked is not None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self._marked is not None:
+            self.latencies.append(time.perf_counter() - self._marked)
+            self._marked = None
+        return False
+
+
+def bench_fetches(win, probe, heartbeat, count):
+    """Sequential fetches, as a user pressing Fetch again and again."""
+    heartbeat.stalls.clear()
+    probe.latencies.clear()
+    heartbeat.start()
+    for i in range(count):
+        probe.mark()
+        harness.fetch_and_wait(win, f"10.5555/bench.{i}")
+        harness.run_until(lambda: not probe.waiting, 2.0)
+    heartbeat.stop()
+    return list(heartbeat.stalls), list(probe.latencies)
+
+
+def bench_burst(win, sched, heartbeat, count):
+    """Many fetches fired without waiting; only the last one is shown."""
+    heartbeat.stalls.clear()
+    heartbeat.start()
+    start = time.perf_counter()
+    for i in range(count):
+        win.doi_entry.setText(f"10.5555/burst.{i}")
+        win.fetch_bibtex()
+    harness.run_until(lambda: win._worker_thread is None and not sched.queued(), 60.0)
+    elapsed = time.perf_counter() - start
+    heartbeat.stop()
+    return list(heartbeat.stalls), elapsed
+
+
+def bench_large_results(win, probe, repeats=5):
+    """Feed results of growing size straight into ``on_fetch_finished``."""
+    slot = {}
+    paint = {}
+    for size in RESULT_SIZES:
+        bibtex = harness.make_bibtex(f"10.5555/large.{size}", size)
+        slot_times = []
+        probe.latencies.clear()
+        for _ in range(repeats):
+            win.textview.clear()
+            harness.run_until(lambda: False, 0.01)
+            probe.mark()
+            start = time.perf_counter()
+            win.on_fetch_finished(True, bibtex, None)
+            slot_times.append(time.perf_counter() - start)
+            harness.run_until(lambda: not probe.waiting, 5.0)
+        slot[str(size)] = harness.summary(slot_times)
+        paint[str(size)] = harness.summary(probe.latencies)
+    return slot, paint
+
+
+def bench_memory(win, count):
+    """Memory retained per fetch once the window is back to idle."""
+    harness.run_until(lambda: False, 0.1)
+    tracemalloc.start()
+    before_traced = tracemalloc.get_traced_memory()[0]
+    before_rss = harness.rss_bytes()
+    for i in range(count):
+        harness.fetch_and_wait(win, f"10.5555/memory.{i}")
+    harness.run_until(lambda: False, 0.2)
+    after_traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    after_rss = harness.rss_bytes()
+    return {
+        "fetches": count,
+        "traced_bytes_per_fetch": (after_traced - before_traced) / count,
+        "rss_bytes_per_fetch": (after_rss - before_rss) / count,
+    }
+
+
+def run(args) -> dict:
+    # Held for the whole run: an unreferenced QApplication is collected at once
+    app = harness.app()  # noqa: F841
+    backend = harness.StubBackend(latency=args.latency, size=args.size)
+    win, sched = harness.make_window(backend)
+    harness.run_until(lambda: False, 0.2)
+
+    probe = PaintProbe(win.textview.viewport())
+    heartbeat = Heartbeat()
+    # Warm-up: first paints, font caches and lazy imports are not what we measure
+    bench_fetches(win, probe, heartbeat, 5)
+
+    stalls, fetch_paint = bench_fetches(win, probe, heartbeat, args.fetches)
+    burst_stalls, burst_elapsed = bench_burst(win, sched, heartbeat, args.burst)
+    slot, result_paint = bench_large_results(win, probe)
+    memory = bench_memory(win, args.memory_fetches)
+
+    win.close()
+    sched.shutdown()
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "backend_latency_ms": args.latency * 1000,
+            "result_size": args.size,
+        },
+        "metrics": {
+            "fetch_stall_ms": harness.summary(stalls),
+            "fetch_to_paint_ms": harness.summary(fetch_paint),
+            "burst_stall_ms": harness.summary(burst_stalls),
+            "burst_total_ms": burst_elapsed * 1000,
+            "result_slot_ms": slot,
+            "result_to_paint_ms": result_paint,
+            "memory": memory,
+        },
+    }
+
+
+def _flatten(metrics, prefix=""):
+    for name, value in metrics.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            yield from _flatten(value, path + ".")
+        elif isinstance(value, (int, float)) and not path.endswith(_NOT_COMPARED):
+            yield path, float(value)
+
+
+def compare(current, baseline, tolerance):
+    """Metrics that got worse than ``baseline`` by more than ``tolerance`` (all are lower-is-better)."""
+    base = dict(_flatten(baseline["metrics"]))
+    regressions = []
+    for path, value in _flatten(current["metrics"]):
+        old = base.get(path)
+        if old is None:
+            continue
+        floor = ABSOLUTE_FLOOR["bytes"] if "bytes" in path else ABSOLUTE_FLOOR["ms"]
+        if value > old * (1 + tolerance) and value - old > floor:
+            regressions.append({"metric": path, "baseline": old, "current": value,
+                                "change": (value - old) / old if old else None})
+    return regressions
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--fetches", type=int, default=200, help="sequential fetches to time")
+    parser.add_argument("--burst", type=int, default=500, help="fetches fired at once")
+    parser.add_argument("--memory-fetches", type=int, default=500, help="fetches for the memory measurement")
+    parser.add_argument("--latency", type=float, default=0.005, help="stub backend latency in seconds")
+    parser.add_argument("--size", type=int, default=2000, help="size of stub results in characters")
+    args = parser.parse_args(argv[1:])
+
+    report = run(args)
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
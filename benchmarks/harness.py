@@ -0,0 +1,145 @@
+"""Shared set-up for the headless GUI benchmarks.
+
+Runs the real :class:`quickbib.main_window.QuickBibWindow` on Qt's offscreen
+platform against an in-process stub backend, so no network (and no doi2bib3
+request) is involved. The stub either replaces the whole lookup at the
+scheduler (:func:`make_window` with a backend), to time the window alone, or
+only the network call (:func:`stub_network`), so cache, in-flight dedup,
+metrics and rate limiting run as in the app. The cache and offline index
+point into a temporary directory, so the user's data is never touched.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+_TMP = tempfile.mkdtemp(prefix="quickbib-bench-")
+os.environ["QUICKBIB_CACHE"] = os.path.join(_TMP, "lookups.sqlite3")
+os.environ["QUICKBIB_OFFLINE_INDEX"] = os.path.join(_TMP, "offline.sqlite3")
+os.environ.pop("QUICKBIB_NORMALIZE", None)
+os.environ.pop("QUICKBIB_KEY_FORMAT", None)
+
+# Run against the checkout, not an installed copy
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from quickbib import helpers, main_window  # noqa: E402
+from quickbib.scheduler import FetchScheduler  # noqa: E402
+
+
+def make_bibtex(identifier: str, size: int) -> str:
+    """A well-formed entry of roughly ``size`` characters."""
+    head = (f"@article{{stub{abs(hash(identifier)) % 10**8},\n"
+            f" author = {{Doe, Jane and Roe, Richard}},\n"
+            f" title = {{Stub Result for {identifier}}},\n"
+            f" journal = {{Phys. Rev. B}},\n year = {{2024}},\n doi = {{{identifier}}},\n")
+    filler = max(0, size - len(head) - 16)
+    words = ("lorem ipsum dolor sit amet " * (filler // 27 + 1))[:filler]
+    return head + f" abstract = {{{words}}}\n}}\n"
+
+
+class StubBackend:
+    """Stands in for ``get_bibtex_for_doi``: fixed latency, results of a given size."""
+
+    def __init__(self, latency: float = 0.005, size: int = 2000):
+        self.latency = latency
+        self.size = size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, identifier, interactive=False):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return True, make_bibtex(identifier, self.size), None
+
+
+    def network(self, identifier):
+        """Stands in for doi2bib3's ``fetch_bibtex``: just the BibTeX text."""
+        return self(identifier)[1]
+
+
+def app():
+    """The QApplication; keep a reference for as long as any widget lives."""
+    return QApplication.instance() or QApplication([sys.argv[0]])
+
+
+def stub_network(backend) -> None:
+    """Answer the network fetch inside the real lookup path from ``backend``."""
+    helpers.fetch_bibtex = backend.network
+
+
+def make_window(backend=None):
+    """Show a window; returns ``(window, scheduler)``.
+
+    With ``backend``, lookups go straight to it on a scheduler of their own;
+    without, the window uses the app's scheduler and lookup path.
+    """
+    if backend is not None:
+        # The window submits through the module-level scheduler
+        main_window.scheduler = FetchScheduler(fetch=backend)
+    win = main_window.QuickBibWindow()
+    win.show()
+    return win, main_window.scheduler
+
+
+def run_until(predicate, timeout: float) -> bool:
+    """Run the event loop until ``predicate()`` is true or ``timeout`` seconds pass."""
+    if predicate():
+        return True
+    loop = QEventLoop()
+    check = QTimer()
+    check.setInterval(1)
+    check.timeout.connect(lambda: predicate() and loop.quit())
+    check.start()
+    QTimer.singleShot(int(timeout * 1000), loop.quit)
+    loop.exec()
+    check.stop()
+    return predicate()
+
+
+def fetch_and_wait(win, identifier: str, timeout: float = 10.0) -> bool:
+    """Type ``identifier``, press Fetch and wait until the result is shown."""
+    win.doi_entry.setText(identifier)
+    win.fetch_bibtex()
+    return run_until(lambda: win._worker_thread is None, timeout)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (0 where it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return rss if sys.platform == "darwin" else rss * 1024
+    except ImportError:
+        return 0
+
+
+def summary(values, scale: float = 1000.0) -> dict:
+    """p50/p95/max/mean of ``values`` (seconds), in milliseconds by default."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) * scale,
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "max": ordered[-1] * scale,
+    }
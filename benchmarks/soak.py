@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Soak test: tens of thousands of lookups through one QuickBibWindow.
+
+QuickBib is meant to stay open all day, so anything a lookup leaves behind
+adds up. This drives the real window headless through the app's own lookup
+path (scheduler, cache, in-flight dedup, metrics, rate limiter); only the
+network call is answered by the stub backend of :mod:`harness`. Most rounds
+are single fetches, each identifier twice in a row so that half of them are
+cache hits. Every tenth round is a burst of fetches that supersede
+each other (the results of all but the last are stale and must be dropped),
+asking for each identifier twice so concurrent requests are deduplicated.
+Every ``--sample`` lookups it records RSS, tracemalloc's traced memory, the
+QObjects visible from Python and the running threads.
+
+After a warm-up the growth of each series between the first and the last
+quarter of the run is compared with a limit; growth beyond it means the
+window is accumulating something, and the exit status is 1. The JSON
+report also lists the allocation sites that grew most, for a start on the
+leak hunt.
+
+Usage::
+
+    python3 benchmarks/soak.py --lookups 50000 -o soak.json
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import tracemalloc
+
+import harness
+from quickbib import memory_debug
+from quickbib.metrics import metrics
+
+BURST_EVERY = 10
+BURST_SIZE = 8
+# Allowed growth between the first and last quarter of the run
+LIMITS = {
+    "rss_bytes": 32 * 1024 * 1024,
+    "traced_bytes": 8 * 1024 * 1024,
+    "qobjects": 64,
+    "threads": 4,
+}
+
+
+def sample(done: int) -> dict:
+    return {
+        "lookups": done,
+        "rss_bytes": harness.rss_bytes(),
+        "traced_bytes": tracemalloc.get_traced_memory()[0],
+        "qobjects": memory_debug.live_qobjects(),
+        "threads": threading.active_count(),
+    }
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def growth(samples, warmup: int) -> dict:
+    """Median of each series in the last quarter minus that in the first, after warm-up."""
+    steady = [s for s in samples if s["lookups"] >= warmup]
+    quarter = max(1, len(steady) // 4)
+    first, last = steady[:quarter], steady[-quarter:]
+    return {name: _median([s[name] for s in last]) - _median([s[name] for s in first])
+            for name in LIMITS}
+
+
+def run(args) -> dict:
+    # Held for the whole run: an unreferenced QApplication is collected at once
+    app = harness.app()  # noqa: F841
+    backend = harness.StubBackend(latency=args.latency, size=args.size)
+    harness.stub_network(backend)
+    win, sched = harness.make_window()
+    tracemalloc.start(memory_debug.TRACE_FRAMES)
+
+    samples = []
+    done = 0
+    rounds = 0
+    singles = 0
+    next_sample = args.sample
+    first_snapshot = None
+    while done < args.lookups:
+        rounds += 1
+        if rounds % BURST_EVERY == 0:
+            for i in range(BURST_SIZE):
+                win.doi_entry.setText(f"10.5555/burst.{done + i // 2}")
+                win.fetch_bibtex()
+            done += BURST_SIZE
+            harness.run_until(lambda: win._worker_thread is None and not win._workers, 30.0)
+        else:
+            # Each identifier is asked for twice in a row; the second is a cache hit
+            harness.fetch_and_wait(win, f"10.5555/soak.{singles // 2}")
+            singles += 1
+            done += 1
+        if done >= next_sample:
+            next_sample += args.sample
+            # Let deleteLater() and the garbage collector catch up first
+            harness.run_until(lambda: False, 0.01)
+            samples.append(sample(done))
+            if first_snapshot is None and done >= args.warmup:
+                first_snapshot = tracemalloc.take_snapshot()
+
+    grew_sites = []
+    if first_snapshot is not None:
+        for stat in tracemalloc.take_snapshot().compare_to(first_snapshot, "lineno")[:10]:
+            if stat.size_diff > 0:
+                grew_sites.append({"site": str(stat.traceback), "bytes": stat.size_diff, "blocks": stat.count_diff})
+    tracemalloc.stop()
+    win.close()
+    sched.shutdown()
+
+    change = growth(samples, args.warmup)
+    failures = [{"metric": name, "growth": change[name], "limit": limit}
+                for name, limit in LIMITS.items() if change[name] > limit]
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "lookups": done,
+            "network_calls": backend.calls,
+            "metrics": {f"{name}{dict(labels) or ''}": value
+                        for (name, labels), value in sorted(metrics.snapshot()["counters"].items())},
+        },
+        "growth": change,
+        "limits": LIMITS,
+        "failures": failures,
+        "top_growth_sites": grew_sites,
+        "samples": samples,
+    }
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--lookups", type=int, default=20000, help="lookups to run (default 20000)")
+    parser.add_argument("--warmup", type=int, default=2000, help="lookups before growth is measured")
+    parser.add_argument("--sample", type=int, default=500, help="lookups between samples")
+    parser.add_argument("--latency", type=float, default=0.001, help="stub network latency in seconds")
+    parser.add_argument("--size", type=int, default=2000, help="size of stub results in characters")
+    args = parser.parse_args(argv[1:])
+    if args.lookups < args.warmup + 4 * args.sample:
+        parser.error("--lookups must leave at least four samples after the warm-up")
+
+    report = run(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for failure in report["failures"]:
+        print(f"soak: {failure['metric']} grew by {failure['growth']} (limit {failure['limit']})", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
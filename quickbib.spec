@@ -48,7 +48,9 @@ pyqt_datas, pyqt_binaries, pyqt_hiddenimports = collect_all('PyQt6')
 # Also include the repository LICENSE file and place it into the `quickbib` package
 # so runtime code that does Path(__file__).with_name('LICENSE') can find it when
 # PyInstaller produces the onedir distribution.
-datas = pyqt_datas + Tree('assets', prefix='assets') + [(os.path.join('.', 'LICENSE'), 'quickbib')]
+# quickbib/data holds the prebuilt journal abbreviation index.
+datas = (pyqt_datas + Tree('assets', prefix='assets') + Tree(os.path.join('quickbib', 'data'), prefix=os.path.join('quickbib', 'data'))
+         + [(os.path.join('.', 'LICENSE'), 'quickbib')])
 binaries = pyqt_binaries
 hiddenimports = pyqt_hiddenimports + ['doi2bib3']
 
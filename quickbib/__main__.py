@@ -1,6 +1,12 @@
-from .quickbib import main
 import sys
 
+from .cli import is_cli_invocation
+
 
 if __name__ == '__main__':
+    # Command line tools must not pull in Qt, so pick the entrypoint first
+    if is_cli_invocation(sys.argv):
+        from .cli import main
+    else:
+        from .quickbib import main
     sys.exit(main(sys.argv))
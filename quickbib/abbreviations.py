@@ -0,0 +1,137 @@
+"""Journal name abbreviations from a prebuilt, memory-mapped index.
+
+The source list is ``data/journal_abbreviations.tsv``; it is compiled into
+``data/journal_abbreviations.idx``, a table of record offsets sorted by
+normalised journal name followed by the records themselves. The index is
+opened with mmap and searched by bisection, so loading it costs nothing up
+front and a lookup touches only a handful of pages, whatever the size of the
+list.
+
+Rebuild the index after editing the list::
+
+    python3 -m quickbib.abbreviations
+"""
+import mmap
+import re
+import struct
+import sys
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+SOURCE_PATH = DATA_DIR / "journal_abbreviations.tsv"
+INDEX_PATH = DATA_DIR / "journal_abbreviations.idx"
+
+_MAGIC = b"QBABBR01"
+_HEADER = struct.Struct("<8sI")
+_OFFSET = struct.Struct("<I")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+# LaTeX accents and braces, as in "Zeitschrift f{\"u}r Physik"
+_LATEX_MARKUP_RE = re.compile(r"\\[A-Za-z]+\s*|\\.|[{}]")
+
+
+def name_key(name: str) -> str:
+    """Normalise a journal name so case, accents and punctuation do not matter."""
+    name = _LATEX_MARKUP_RE.sub("", name.replace("\\&", "&").replace("&", " and "))
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    words = _NON_WORD_RE.sub(" ", name.lower()).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def read_source(path=SOURCE_PATH) -> dict:
+    """Read ``name<TAB>abbreviation`` lines; later lines win."""
+    pairs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#") or "\t" not in line:
+                continue
+            name, abbrev = line.split("\t", 1)
+            key = name_key(name)
+            if key and abbrev.strip():
+                pairs[key] = abbrev.strip()
+    return pairs
+
+
+def compile_index(pairs: dict, path=INDEX_PATH) -> int:
+    """Write ``{name_key: abbreviation}`` as an index file; returns the entry count."""
+    records = sorted((k.encode("utf-8"), v.encode("utf-8")) for k, v in pairs.items())
+    blob = bytearray()
+    offsets = []
+    for key, value in records:
+        offsets.append(len(blob))
+        blob += key + b"\0" + value + b"\0"
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(records)))
+        for offset in offsets:
+            f.write(_OFFSET.pack(offset))
+        f.write(blob)
+    return len(records)
+
+
+class AbbreviationIndex:
+    def __init__(self, path=INDEX_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a journal abbreviation index")
+        self._blob = _HEADER.size + self._count * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, i: int):
+        start = self._blob + _OFFSET.unpack_from(self._mm, _HEADER.size + i * _OFFSET.size)[0]
+        key_end = self._mm.find(b"\0", start)
+        return start, key_end
+
+    def get(self, name: str):
+        """Return the abbreviation for journal ``name``, or None."""
+        key = name_key(name).encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, key_end = self._record(mid)
+            probe = self._mm[start:key_end]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                value_end = self._mm.find(b"\0", key_end + 1)
+                return self._mm[key_end + 1:value_end].decode("utf-8")
+        return None
+
+
+_index = None
+
+
+def default_index():
+    """The bundled index, opened on first use; None if it is missing."""
+    global _index
+    if _index is None:
+        try:
+            _index = AbbreviationIndex()
+        except (OSError, ValueError):
+            _index = False
+    return _index or None
+
+
+@lru_cache(maxsize=4096)
+def abbreviate(journal: str) -> str:
+    """Return the ISO 4 abbreviation of ``journal``, or ``journal`` if unknown."""
+    index = default_index()
+    if index is None:
+        return journal
+    return index.get(journal) or journal
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else SOURCE_PATH
+    count = compile_index(read_source(source))
+    print(f"Wrote {count} abbreviations to {INDEX_PATH}")
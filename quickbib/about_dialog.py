@@ -115,16 +115,11 @@ class AboutDialog(QDialog):
         authors_text.setOpenExternalLinks(True)
         tabs.addTab(authors_text, "Authors")
 
-        license_text = QTextBrowser()
-        if LICENSE_PATH.exists():
-            try:
-                license_content = LICENSE_PATH.read_text(encoding="utf-8")
-                license_text.setPlainText(license_content)
-            except Exception:
-                license_text.setHtml("<p>Unable to read LICENSE file.</p>")
-        else:
-            license_text.setHtml(f"<p>License file not found in repository. See <a href=\"{REPO_URL}\">project page</a>.</p>")
-        tabs.addTab(license_text, "License")
+        # The GPL text is long; only read it when the tab is first opened
+        self._license_text = QTextBrowser()
+        self._license_loaded = False
+        self._license_index = tabs.addTab(self._license_text, "License")
+        tabs.currentChanged.connect(self._on_tab_changed)
 
         btn_hbox = QHBoxLayout()
         btn_hbox.addStretch()
@@ -140,3 +135,18 @@ class AboutDialog(QDialog):
         close_btn.setFixedHeight(28)
         btn_hbox.addWidget(close_btn)
         vbox.addLayout(btn_hbox)
+
+    def _on_tab_changed(self, index):
+        if index == self._license_index and not self._license_loaded:
+            self._load_license()
+
+    def _load_license(self):
+        self._license_loaded = True
+        if LICENSE_PATH.exists():
+            try:
+                license_content = LICENSE_PATH.read_text(encoding="utf-8")
+                self._license_text.setPlainText(license_content)
+            except Exception:
+                self._license_text.setHtml("<p>Unable to read LICENSE file.</p>")
+        else:
+            self._license_text.setHtml(f"<p>License file not found in repository. See <a href=\"{REPO_URL}\">project page</a>.</p>")
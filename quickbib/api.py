@@ -0,0 +1,101 @@
+"""Public Python API for resolving identifiers to BibTeX.
+
+This module never imports Qt, so it is cheap to use from scripts, build
+tools and notebooks::
+
+    from quickbib import api
+
+    result = api.resolve("10.1038/nphys1170")
+    if result.found:
+        print(result.bibtex)
+
+    for result in api.resolve_many(["arXiv:2411.08091", "hep-th/9901001"]):
+        print(result.identifier, result.found)
+
+    # In async code (e.g. a Jupyter cell)
+    result = await api.aresolve("10.1038/nphys1170")
+    async for result in api.aresolve_many(ids, concurrency=4):
+        ...
+
+Identifiers are anything the QuickBib window accepts: DOIs, doi.org links,
+arXiv IDs and URLs, journal URLs or article titles. Lookups share the
+window's persistent cache, offline index, rate limit and de-duplication of
+concurrent requests for the same identifier.
+
+The sync and async functions behave the same: all of them run their lookups
+on the shared scheduler (:mod:`quickbib.scheduler`). Single lookups are
+interactive; batches are bulk work, so they make way for interactive
+lookups and together run at most ``scheduler.workers`` (8) lookups at a
+time, whatever ``concurrency`` asks for.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from .batch import DEFAULT_WORKERS, fetch_many
+from .scheduler import BULK, INTERACTIVE, scheduler
+
+__all__ = ["Result", "resolve", "resolve_many", "aresolve", "aresolve_many"]
+
+
+@dataclass(frozen=True)
+class Result:
+    """Outcome of resolving one identifier."""
+
+    identifier: str
+    found: bool
+    bibtex: str = ""
+    error: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return self.found
+
+
+def resolve(identifier: str) -> Result:
+    """Resolve one identifier. Never raises for lookup failures; see ``Result.error``."""
+    try:
+        found, bibtex, error = scheduler.submit(identifier, INTERACTIVE).result()
+    except Exception as e:
+        found, bibtex, error = False, "", str(e)
+    return Result(identifier, found, bibtex, error)
+
+
+def resolve_many(identifiers: Iterable[str], concurrency: int = DEFAULT_WORKERS) -> Iterator[Result]:
+    """Resolve ``identifiers`` with up to ``concurrency`` parallel lookups.
+
+    ``concurrency`` is capped by the shared scheduler's ``workers``. Results
+    are yielded as they complete, not in input order. Duplicate and blank
+    identifiers are skipped.
+    """
+    for identifier, found, bibtex, error in fetch_many(identifiers, concurrency):
+        yield Result(identifier, found, bibtex, error)
+
+
+async def _aresolve(identifier: str, priority: int) -> Result:
+    try:
+        found, bibtex, error = await asyncio.wrap_future(scheduler.submit(identifier, priority))
+    except Exception as e:
+        found, bibtex, error = False, "", str(e)
+    return Result(identifier, found, bibtex, error)
+
+
+async def aresolve(identifier: str) -> Result:
+    """Async version of :func:`resolve`; the lookup runs on the shared scheduler."""
+    return await _aresolve(identifier, INTERACTIVE)
+
+
+async def aresolve_many(identifiers: Iterable[str], concurrency: int = DEFAULT_WORKERS) -> AsyncIterator[Result]:
+    """Async version of :func:`resolve_many`, yielding in completion order.
+
+    Like it, this is bulk work on the shared scheduler, so ``concurrency``
+    is capped by ``scheduler.workers``.
+    """
+    unique = list(dict.fromkeys(i.strip() for i in identifiers if i and i.strip()))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(identifier):
+        async with semaphore:
+            return await _aresolve(identifier, BULK)
+
+    for next_done in asyncio.as_completed([bounded(i) for i in unique]):
+        yield await next_done
@@ -1,3 +1,5 @@
+import os
+import sys
 from pathlib import Path
 
 # Application metadata
@@ -9,3 +11,32 @@ REPO_URL = "https://github.com/archisman-panigrahi/QuickBib"
 # Use resolve().parent.parent so this works when the package is imported from
 # an installed location or run from source.
 LICENSE_PATH = Path(__file__).resolve().parent.parent / "LICENSE"
+
+
+def _user_cache_dir() -> Path:
+    """Return the per-user cache directory following platform conventions."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        return Path(base) / APP_NAME / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / APP_NAME
+    # XDG_CACHE_HOME is also what Flatpak and Snap redirect into the sandbox
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "quickbib"
+
+
+def _user_data_dir() -> Path:
+    """Return the per-user data directory following platform conventions."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        return Path(base) / APP_NAME
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Application Support" / APP_NAME
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(base) / "quickbib"
+
+
+# Cache for data that can always be regenerated (scan results, fetched entries)
+CACHE_DIR = _user_cache_dir()
+# Data the user created on purpose and that is expensive to rebuild
+DATA_DIR = _user_data_dir()
@@ -0,0 +1,71 @@
+"""Concurrent resolution of many identifiers at once.
+
+Used by the folder scanner and the command line tools. Each lookup goes
+through :func:`quickbib.helpers.get_bibtex_for_doi`, exactly as a lookup
+typed into the main window would.
+"""
+import re
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from . import keys
+from .scheduler import BULK, scheduler
+
+# Lookups are network bound; a handful of parallel requests is plenty and
+# keeps us polite towards doi.org, CrossRef and arXiv.
+DEFAULT_WORKERS = 8
+
+_KEY_RE = re.compile(r"\s*@\w+\s*[{(]\s*([^,\s]+)\s*,")
+
+
+def fetch_many(identifiers, max_workers: int = DEFAULT_WORKERS, priority: int = BULK):
+    """Resolve ``identifiers`` concurrently on the shared scheduler.
+
+    At most ``max_workers`` lookups of this batch are queued at a time, so
+    interactive lookups never wait behind a long list. Duplicates and blank
+    entries are dropped. Yields ``(identifier, found, bibtex, error)`` tuples
+    in completion order.
+    """
+    unique = list(dict.fromkeys(i.strip() for i in identifiers if i and i.strip()))
+    todo = iter(unique)
+    pending = {}
+    limit = max(1, max_workers)
+    while True:
+        for ident in todo:
+            pending[scheduler.submit(ident, priority)] = ident
+            if len(pending) >= limit:
+                break
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            ident = pending.pop(fut)
+            try:
+                found, bibtex, error = fut.result()
+            except Exception as e:
+                found, bibtex, error = False, "", str(e)
+            yield ident, found, bibtex, error
+
+
+def bibtex_key(bibtex: str):
+    """Return the citation key of the first entry in ``bibtex``, or None."""
+    m = _KEY_RE.match(bibtex)
+    return m.group(1) if m else None
+
+
+def combine_bibtex(entries) -> str:
+    """Join BibTeX strings into one document, one blank line between entries."""
+    blocks = [e.strip() for e in entries if e and e.strip()]
+    return "\n\n".join(blocks) + "\n" if blocks else ""
+
+
+def write_bib(path, entries, rekey: bool = True) -> None:
+    """Write the given BibTeX strings to ``path`` as a single .bib file.
+
+    With a key format set (:data:`quickbib.keys.key_format`), keys are
+    regenerated and made unique across the file, in the order given;
+    ``rekey=False`` is for entries whose keys were already assigned.
+    """
+    if rekey and keys.key_format:
+        entries = keys.assign_keys(entries, keys.key_format)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(combine_bibtex(entries))
@@ -0,0 +1,224 @@
+"""Keep a .bib file resolved while it is being edited.
+
+People paste bare stubs such as ``@article{smith20, doi = {10.1000/xyz}}``
+into their working .bib while writing. :class:`BibWatcher` watches the file
+(inotify on Linux, polling elsewhere) and replaces every stub, meaning an
+entry with a DOI, eprint or URL but no title, by the full entry fetched for
+it. The stub's citation key is kept, so existing ``\\cite`` commands stay
+valid.
+
+Every entry is hashed, and entries already seen are skipped without being
+parsed, so a save that only touched the text costs one read and one hash
+per entry, with no network access. The file is rewritten atomically and
+only if an entry was actually resolved.
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+from . import bibfile
+from .batch import DEFAULT_WORKERS, fetch_many
+
+POLL_INTERVAL = 1.0
+# Editors often write a file in several steps; wait for it to settle
+SETTLE_DELAY = 0.2
+# Fields that identify the work of a stub, in order of preference
+ID_FIELDS = ("doi", "eprint", "arxiv", "url")
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def stub_identifier(entry):
+    """Return the identifier to resolve if ``entry`` is a stub, otherwise None."""
+    if entry is None or entry.type in bibfile.SPECIAL_TYPES or "title" in entry.fields:
+        return None
+    for name in ID_FIELDS:
+        value = entry.fields.get(name, "").strip()
+        if value:
+            if name in ("eprint", "arxiv") and not value.lower().startswith("arxiv:"):
+                value = "arXiv:" + value
+            return value
+    return None
+
+
+class BibWatcher:
+    def __init__(self, path, max_workers: int = DEFAULT_WORKERS, progress=None):
+        self.path = os.fspath(path)
+        self.max_workers = max_workers
+        self.progress = progress
+        # Hashes of entries that need no work: complete entries, the ones we
+        # wrote, and stubs that failed (retried once the user edits them)
+        self._known = set()
+        self._file_digest = None
+
+    def _report(self, msg: str) -> None:
+        if self.progress:
+            self.progress(msg)
+
+    def update(self) -> int:
+        """Resolve new or changed stubs once; returns the number of entries replaced."""
+        try:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return 0
+        file_digest = _digest(text)
+        if file_digest == self._file_digest:
+            return 0
+
+        chunks = bibfile.split(text)
+        stubs = {}  # chunk index -> identifier
+        for i, chunk in enumerate(chunks):
+            if not chunk.startswith("@"):
+                continue
+            digest = _digest(chunk)
+            if digest in self._known:
+                continue
+            identifier = stub_identifier(bibfile.parse_entry(chunk))
+            if identifier is None:
+                self._known.add(digest)
+            else:
+                stubs[i] = identifier
+
+        if not stubs:
+            self._file_digest = file_digest
+            return 0
+
+        self._report(f"Resolving {len(stubs)} new entr{'y' if len(stubs) == 1 else 'ies'}...")
+        results = {ident: (found, bibtex, error)
+                   for ident, found, bibtex, error in fetch_many(stubs.values(), self.max_workers)}
+        replaced = 0
+        for i, identifier in stubs.items():
+            found, bibtex, error = results.get(identifier, (False, "", None))
+            if not found or not bibtex.strip().startswith("@"):
+                self._report(f"could not resolve {identifier}: {error or 'not found'}")
+                self._known.add(_digest(chunks[i]))
+                continue
+            key = bibfile.parse_entry(chunks[i]).key
+            new = bibtex.strip()
+            if key:
+                new = bibfile.replace_key(new, key)
+            chunks[i] = new
+            self._known.add(_digest(new))
+            replaced += 1
+
+        if replaced:
+            new_text = "".join(chunks)
+            # Do not overwrite edits saved while we were fetching; the change
+            # event for them brings us back here with the new text.
+            try:
+                with open(self.path, "r", encoding="utf-8", newline="") as f:
+                    if _digest(f.read()) != file_digest:
+                        return 0
+            except FileNotFoundError:
+                return 0
+            bibfile.write_atomic(self.path, new_text)
+            self._file_digest = _digest(new_text)
+            self._report(f"Updated {replaced} entr{'y' if replaced == 1 else 'ies'} in {self.path}")
+        else:
+            self._file_digest = file_digest
+        return replaced
+
+    def watch(self, stop=None, poll: bool = False) -> None:
+        """Call :meth:`update` on every change until ``stop`` (an Event) is set."""
+        waiter = None
+        if not poll:
+            try:
+                waiter = _Inotify(self.path)
+            except OSError:
+                waiter = None
+        if waiter is None:
+            waiter = _Poller(self.path)
+        try:
+            self.update()
+            while stop is None or not stop.is_set():
+                if waiter.wait(POLL_INTERVAL):
+                    time.sleep(SETTLE_DELAY)
+                    waiter.drain()
+                    self.update()
+        finally:
+            waiter.close()
+
+
+class _Poller:
+    def __init__(self, path):
+        self.path = path
+        self._state = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        state = self._stat()
+        changed = state != self._state
+        self._state = state
+        return changed
+
+    def drain(self) -> None:
+        self._state = self._stat()
+
+    def close(self) -> None:
+        pass
+
+
+class _Inotify:
+    """Change notifications for one file via Linux inotify, through ctypes."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory: editors and our own atomic rewrite replace the
+        # file by renaming, which would orphan a watch on the file itself.
+        directory = os.path.dirname(os.path.abspath(path)) or "."
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed")
+        self._name = os.fsencode(os.path.basename(path))
+
+    def _read(self) -> bool:
+        hit = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return hit
+            pos = 0
+            while pos + self._EVENT.size <= len(data):
+                _, _, _, length = self._EVENT.unpack_from(data, pos)
+                pos += self._EVENT.size
+                if data[pos:pos + length].rstrip(b"\0") == self._name:
+                    hit = True
+                pos += length
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        return bool(ready) and self._read()
+
+    def drain(self) -> None:
+        self._read()
+
+    def close(self) -> None:
+        os.close(self._fd)
@@ -0,0 +1,196 @@
+"""Minimal, lossless splitting of .bib files.
+
+A .bib file is split into chunks that join back to exactly the original
+text: every ``@type{...}`` entry is one chunk, and whatever lies between
+entries (comments, blank lines, stray text) is kept as-is in the chunks in
+between. Tools that rewrite single entries can therefore leave the rest of
+a hand-edited file untouched, down to the whitespace.
+"""
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+
+_ENTRY_START_RE = re.compile(r"@\s*([A-Za-z]+)\s*([{(])")
+_KEY_RE = re.compile(r"\s*([^,\s]*)\s*,")
+_FIELD_NAME_RE = re.compile(r"\s*([A-Za-z][\w:.+-]*)\s*=\s*")
+_BARE_VALUE_RE = re.compile(r"[^,#\s})]+")
+_DELIMITER_RE = re.compile(r"[{}()]")
+# Entry types that hold no reference
+SPECIAL_TYPES = frozenset({"comment", "preamble", "string"})
+
+
+@dataclass
+class Entry:
+    type: str
+    key: str
+    # Lower-cased field name -> value without its outer braces or quotes
+    fields: dict = field(default_factory=dict)
+    # Lower-cased field name -> value exactly as written (braces, macros, #)
+    raw: dict = field(default_factory=dict)
+    # False if part of the body could not be parsed (and is missing above)
+    complete: bool = True
+
+
+def group_end(text: str, start: int, opener: str = "{") -> int:
+    """Index just past the group whose delimiter ``opener`` is at ``start``, or -1."""
+    closer = "}" if opener == "{" else ")"
+    if opener == "{":
+        # Most field values hold no nested group
+        close = text.find("}", start + 1)
+        if close >= 0 and text.find("{", start + 1, close) < 0:
+            return close + 1
+    depth = 0
+    # Only delimiters matter, so let the regex engine skip everything else
+    for m in _DELIMITER_RE.finditer(text, start):
+        c = m.group()
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0 and closer == "}":
+                return m.end()
+            if depth < 0:
+                return -1
+        elif c == ")" and closer == ")" and depth == 0:
+            return m.end()
+    return -1
+
+
+def split(text: str) -> list:
+    """Split ``text`` into chunks; ``"".join(split(text)) == text`` always holds."""
+    chunks = []
+    pos = 0
+    while True:
+        m = _ENTRY_START_RE.search(text, pos)
+        if m is None:
+            break
+        end = group_end(text, m.start(2), m.group(2))
+        if end < 0:
+            # Unbalanced (typically mid-edit): leave the rest alone
+            break
+        if m.start() > pos:
+            chunks.append(text[pos:m.start()])
+        chunks.append(text[m.start():end])
+        pos = end
+    if pos < len(text):
+        chunks.append(text[pos:])
+    return chunks
+
+
+def _read_value(body: str, pos: int):
+    """Read one field value starting at ``pos``; returns ``(value, end)``."""
+    parts = []
+    while True:
+        while pos < len(body) and body[pos].isspace():
+            pos += 1
+        if pos >= len(body):
+            break
+        c = body[pos]
+        if c == "{":
+            end = group_end(body, pos, "{")
+            if end < 0:
+                end = len(body)
+            parts.append(body[pos + 1:end - 1])
+            pos = end
+        elif c == '"':
+            depth = 0
+            end = pos + 1
+            while end < len(body) and not (body[end] == '"' and depth == 0):
+                if body[end] == "{":
+                    depth += 1
+                elif body[end] == "}":
+                    depth -= 1
+                end += 1
+            parts.append(body[pos + 1:end])
+            pos = end + 1
+        else:
+            m = _BARE_VALUE_RE.match(body, pos)
+            if not m:
+                break
+            parts.append(m.group(0))
+            pos = m.end()
+        while pos < len(body) and body[pos].isspace():
+            pos += 1
+        if pos < len(body) and body[pos] == "#":
+            pos += 1
+            continue
+        break
+    return "".join(parts), pos
+
+
+def parse_entry(chunk: str):
+    """Parse an entry chunk from :func:`split`; returns an :class:`Entry` or None."""
+    m = _ENTRY_START_RE.match(chunk)
+    if m is None:
+        return None
+    entry_type = m.group(1).lower()
+    body = chunk[m.end():-1]
+    if entry_type in SPECIAL_TYPES:
+        return Entry(entry_type, "")
+    km = _KEY_RE.match(body)
+    if km is None:
+        # "@misc{key}" without fields
+        return Entry(entry_type, body.strip())
+    entry = Entry(entry_type, km.group(1))
+    pos = km.end()
+    while True:
+        fm = _FIELD_NAME_RE.match(body, pos)
+        if fm is None:
+            break
+        value, end = _read_value(body, fm.end())
+        name = fm.group(1).lower()
+        entry.fields[name] = value.strip()
+        entry.raw[name] = body[fm.end():end].strip()
+        pos = end
+        while pos < len(body) and body[pos] in ", \t\r\n":
+            pos += 1
+    entry.complete = not body[pos:].strip()
+    return entry
+
+
+def replace_key(chunk: str, key: str) -> str:
+    """Return the entry ``chunk`` with its citation key replaced by ``key``."""
+    m = _ENTRY_START_RE.match(chunk)
+    if m is None:
+        return chunk
+    km = _KEY_RE.match(chunk, m.end())
+    if km is None:
+        return chunk
+    return chunk[:km.start(1)] + key + chunk[km.end(1):]
+
+
+def format_entry(entry: Entry) -> str:
+    """Write ``entry`` in the layout doi2bib3 uses.
+
+    Values with an entry in ``entry.raw`` are written in that form, so code
+    that changes a value must drop its raw form.
+    """
+    lines = []
+    for name, value in entry.fields.items():
+        raw = entry.raw.get(name)
+        lines.append(f" {name} = {raw if raw is not None else '{' + value + '}'}")
+    return f"@{entry.type}{{{entry.key},\n" + ",\n".join(lines) + "\n}"
+
+
+def write_atomic(path, text: str) -> None:
+    """Replace ``path`` with ``text`` so readers never see a partial file."""
+    path = os.fspath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
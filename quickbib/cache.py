@@ -0,0 +1,168 @@
+"""Persistent cache of lookup results.
+
+Every lookup made through :func:`quickbib.helpers.get_bibtex_for_doi` is
+remembered in an SQLite database in the user cache directory, together with
+the time it was fetched. Successful results are kept; failures are only
+remembered for :data:`NEGATIVE_TTL` seconds so a typo is not retried over
+and over, while a paper that appears later is still found.
+
+The cache can be exported as a bundle (gzip-compressed JSON lines with a
+versioned header) and imported on another machine. Import keeps whichever
+copy of an entry was fetched last, and both directions stream, so bundles of
+any size are handled in constant memory.
+"""
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .app_info import CACHE_DIR
+from .identifiers import parse_doi
+
+CACHE_PATH = CACHE_DIR / "lookups.sqlite3"
+NEGATIVE_TTL = 60 * 60
+BUNDLE_FORMAT = "quickbib-cache"
+BUNDLE_VERSION = 1
+# Rows written per transaction while importing a bundle
+IMPORT_BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    identifier TEXT PRIMARY KEY,
+    found INTEGER NOT NULL,
+    bibtex TEXT NOT NULL,
+    error TEXT,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO entries (identifier, found, bibtex, error, fetched_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (identifier) DO UPDATE SET
+    found = excluded.found, bibtex = excluded.bibtex,
+    error = excluded.error, fetched_at = excluded.fetched_at
+WHERE excluded.fetched_at > entries.fetched_at
+"""
+
+_local = threading.local()
+
+
+def cache_path():
+    """Location of the cache; ``QUICKBIB_CACHE`` overrides it."""
+    override = os.environ.get("QUICKBIB_CACHE")
+    return override or str(CACHE_PATH)
+
+
+def _connection():
+    path = cache_path()
+    db = getattr(_local, "db", None)
+    if db is not None and _local.path == path:
+        return db
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    _local.db, _local.path = db, path
+    return db
+
+
+def cache_key(identifier: str) -> str:
+    """DOIs are case-insensitive and come in several spellings; fold them."""
+    identifier = identifier.strip()
+    doi = parse_doi(identifier)
+    return f"doi:{doi.lower()}" if doi else identifier
+
+
+def get(identifier: str):
+    """Return the cached ``(found, bibtex, error)`` for ``identifier``, or None."""
+    try:
+        row = _connection().execute(
+            "SELECT found, bibtex, error, fetched_at FROM entries WHERE identifier = ?",
+            (cache_key(identifier),),
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    found, bibtex, error, fetched_at = row
+    if not found and time.time() - fetched_at > NEGATIVE_TTL:
+        return None
+    return bool(found), bibtex, error
+
+
+def put(identifier: str, found: bool, bibtex: str, error=None) -> None:
+    try:
+        db = _connection()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (cache_key(identifier), int(found), bibtex, error, time.time()),
+            )
+    except sqlite3.Error:
+        # The cache is only an optimisation
+        pass
+
+
+def export_bundle(path) -> int:
+    """Write all successful lookups to a bundle at ``path``; returns the count."""
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        header = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "created": time.time()}
+        f.write(json.dumps(header) + "\n")
+        rows = _connection().execute(
+            "SELECT identifier, bibtex, fetched_at FROM entries WHERE found = 1 ORDER BY identifier"
+        )
+        for identifier, bibtex, fetched_at in rows:
+            f.write(json.dumps({"id": identifier, "bibtex": bibtex, "fetched_at": fetched_at}) + "\n")
+            count += 1
+    return count
+
+
+def import_bundle(path):
+    """Merge a bundle into the cache.
+
+    Entries newer than the local copy replace it; older ones are ignored.
+    Returns ``(merged, skipped)``. Raises ``ValueError`` for files that are not
+    cache bundles, come from a newer, unknown format version or hold a
+    malformed record; nothing is imported from those.
+    """
+    db = _connection()
+    total = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except (ValueError, EOFError, OSError):
+            raise ValueError(f"{path} is not a QuickBib cache bundle")
+        if not isinstance(header, dict) or header.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a QuickBib cache bundle")
+        if header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported cache bundle version {header.get('version')}")
+
+        # One transaction for the whole bundle: a malformed record halfway
+        # through leaves the cache as it was.
+        before = db.total_changes
+        batch = []
+        lineno = 1
+        try:
+            with db:
+                for lineno, line in enumerate(f, 2):
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    if not isinstance(item["id"], str) or not isinstance(item["bibtex"], str):
+                        raise TypeError("id and bibtex must be strings")
+                    batch.append((item["id"], 1, item["bibtex"], None, float(item["fetched_at"])))
+                    total += 1
+                    if len(batch) >= IMPORT_BATCH:
+                        db.executemany(_UPSERT, batch)
+                        batch = []
+                if batch:
+                    db.executemany(_UPSERT, batch)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"{path}: malformed record on line {lineno} ({e!r}); nothing imported")
+        except EOFError:
+            raise ValueError(f"{path} is truncated; nothing imported")
+        merged = db.total_changes - before
+    return merged, total - merged
@@ -0,0 +1,281 @@
+"""Command line entry points that run without starting the GUI.
+
+``python -m quickbib <command> ...`` dispatches here when the first argument
+is one of :data:`COMMANDS`; anything else starts the window as before.
+Nothing in this module imports Qt.
+"""
+import argparse
+import sys
+
+from .app_info import APP_NAME, APP_VERSION
+
+
+def _err(msg: str) -> None:
+    print(msg, file=sys.stderr)
+
+
+def cmd_scan_pdfs(args) -> int:
+    from .batch import write_bib
+    from .pdf_scan import build_bibliography
+
+    entries, missing = build_bibliography(args.paths, max_workers=args.jobs, progress=_err)
+    for path, reason in missing:
+        _err(f"skipped {path}: {reason}")
+    write_bib(args.output, entries)
+    _err(f"Wrote {len(entries)} entries to {args.output}")
+    return 0 if entries or not missing else 1
+
+
+def cmd_scan_tex(args) -> int:
+    from .batch import write_bib
+    from .tex_scan import scan_tex, resolve_references, write_report
+
+    references = list(scan_tex(args.main))
+    if not references:
+        _err(f"No DOIs or arXiv IDs found in {args.main}")
+        return 1
+    _err(f"Resolving {len(references)} identifier(s)...")
+    entries, rows = resolve_references(references, max_workers=args.jobs)
+    write_bib(args.output, entries, rekey=False)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            write_report(rows, f)
+    else:
+        write_report(rows, sys.stdout)
+    _err(f"Wrote {len(entries)} of {len(rows)} entries to {args.output}")
+    return 0 if len(entries) == len(rows) else 1
+
+
+def cmd_import_crossref(args) -> int:
+    from .offline_index import ingest, index_path
+
+    index = args.index or index_path()
+    added = ingest(args.paths, index=index, max_workers=args.jobs, titles=not args.no_titles, progress=_err)
+    _err(f"Added {added} works to {index}")
+    return 0
+
+
+def cmd_cache_export(args) -> int:
+    from .cache import export_bundle
+
+    count = export_bundle(args.bundle)
+    _err(f"Exported {count} entries to {args.bundle}")
+    return 0
+
+
+def cmd_cache_import(args) -> int:
+    from .cache import import_bundle
+
+    status = 0
+    for bundle in args.bundles:
+        try:
+            merged, skipped = import_bundle(bundle)
+        except (OSError, ValueError) as e:
+            _err(f"Error: {e}")
+            status = 1
+            continue
+        _err(f"{bundle}: merged {merged} entries, skipped {skipped} already up to date")
+    return status
+
+
+def cmd_batch(args) -> int:
+    from .jobs import read_identifiers, default_job_id, journal_path, run_job
+
+    if args.input == "-":
+        identifiers = read_identifiers(sys.stdin)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            identifiers = read_identifiers(f)
+    job_id = args.job_id or default_job_id(identifiers)
+    if args.fresh:
+        journal_path(job_id).unlink(missing_ok=True)
+    try:
+        written, failed = run_job(job_id, identifiers, args.output, max_workers=args.jobs, progress=_err)
+    except KeyboardInterrupt:
+        _err(f"Interrupted. Run again with --job-id {job_id} to resume.")
+        return 130
+    for ident, error in failed:
+        _err(f"failed {ident}: {error}")
+    _err(f"Wrote {written} entries to {args.output} (job {job_id}, {len(failed)} failed)")
+    return 0 if not failed else 1
+
+
+def cmd_watch(args) -> int:
+    from .bib_watch import BibWatcher
+
+    watcher = BibWatcher(args.bib, max_workers=args.jobs, progress=_err)
+    if args.once:
+        watcher.update()
+        return 0
+    _err(f"Watching {args.bib} (Ctrl-C to stop)")
+    try:
+        watcher.watch(poll=args.poll)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_normalize(args) -> int:
+    from .normalize import normalize_file
+
+    if args.output and len(args.bibs) > 1:
+        _err("Error: --output needs a single input file")
+        return 2
+    status = 0
+    for path in args.bibs:
+        try:
+            changed = normalize_file(path, output=args.output)
+        except OSError as e:
+            _err(f"Error: {e}")
+            status = 1
+            continue
+        _err(f"{path}: normalised {changed} entr{'y' if changed == 1 else 'ies'}")
+    return status
+
+
+def cmd_rekey(args) -> int:
+    from .bibfile import write_atomic
+    from .keys import DEFAULT_FORMAT, rekey_bib
+
+    with open(args.bib, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    new_text, mapping = rekey_bib(text, args.key_format or DEFAULT_FORMAT)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(new_text)
+    elif new_text != text:
+        write_atomic(args.bib, new_text)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write("old_key\tnew_key\n")
+            for old, new in mapping:
+                f.write(f"{old}\t{new}\n")
+    changed = sum(1 for old, new in mapping if old != new)
+    _err(f"Changed {changed} of {len(mapping)} keys")
+    return 0
+
+
+def cmd_add(args) -> int:
+    from .batch import fetch_many
+    from .keys import DEFAULT_FORMAT, add_to_library
+
+    fetched = {}
+    failed = 0
+    for ident, found, bibtex, error in fetch_many(args.identifiers, args.jobs):
+        if found:
+            fetched[ident] = bibtex
+        else:
+            failed += 1
+            _err(f"failed {ident}: {error or 'not found'}")
+    # Keys are assigned in the order given, so the outcome is reproducible
+    ordered = [fetched[i] for i in dict.fromkeys(i.strip() for i in args.identifiers) if i in fetched]
+    for key, added in add_to_library(args.library, ordered, args.key_format or DEFAULT_FORMAT):
+        print(key if added else f"{key} (already in {args.library})")
+    return 0 if not failed else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="quickbib", description=f"{APP_NAME} command line tools")
+    parser.add_argument("--version", action="version", version=f"{APP_NAME} {APP_VERSION}")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # Options every command accepts
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--metrics", metavar="FILE",
+                        help="write fetch metrics on exit (.prom/.txt: Prometheus text, otherwise JSON)")
+    common.add_argument("--normalize", action="store_true",
+                        help="abbreviate journals and clean up fields of fetched entries (offline)")
+    common.add_argument("--key-format", metavar="FORMAT",
+                        help="generate citation keys, e.g. '{author}{year}{firstword}'; "
+                             "placeholders: author, authors, year, firstword, shorttitle")
+
+    p = sub.add_parser("scan-pdfs", parents=[common], help="build a .bib from the DOIs/arXiv IDs in a folder of PDFs")
+    p.add_argument("paths", nargs="+", help="PDF files or directories to scan recursively")
+    p.add_argument("-o", "--output", required=True, help="the .bib file to write")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="number of scanner processes")
+    p.set_defaults(func=cmd_scan_pdfs)
+
+    p = sub.add_parser("scan-tex", parents=[common], help="resolve every DOI/arXiv ID referenced by a LaTeX project")
+    p.add_argument("main", help="main .tex file; \\input and \\include are followed")
+    p.add_argument("-o", "--output", required=True, help="the .bib file to write")
+    p.add_argument("-r", "--report", help="write the identifier to key mapping here (default: stdout)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="number of parallel lookups")
+    p.set_defaults(func=cmd_scan_tex)
+
+    p = sub.add_parser("import-crossref", parents=[common], help="build the offline index from a local CrossRef metadata dump")
+    p.add_argument("paths", nargs="+", help="dump directories or .json(.gz)/.jsonl(.gz) shard files")
+    p.add_argument("--index", help="index file to create or extend (default: $QUICKBIB_OFFLINE_INDEX or the user data directory)")
+    p.add_argument("--no-titles", action="store_true", help="do not index titles, only DOIs")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="number of parser processes")
+    p.set_defaults(func=cmd_import_crossref)
+
+    p = sub.add_parser("batch", parents=[common], help="resolve a list of identifiers; resumable after interruption")
+    p.add_argument("input", help="file with one identifier per line, or - for stdin")
+    p.add_argument("-o", "--output", required=True, help="the .bib file to write")
+    p.add_argument("--job-id", help="name of the job to run or resume (default: derived from the input)")
+    p.add_argument("--fresh", action="store_true", help="discard the job's journal and start over")
+    p.add_argument("-j", "--jobs", type=int, default=8, help="number of parallel lookups")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("watch", parents=[common], help="keep resolving DOI/arXiv stubs pasted into a .bib file")
+    p.add_argument("bib", help="the .bib file to watch; it is rewritten in place")
+    p.add_argument("--once", action="store_true", help="resolve the current stubs and exit")
+    p.add_argument("--poll", action="store_true", help="poll for changes instead of using inotify")
+    p.add_argument("-j", "--jobs", type=int, default=8, help="number of parallel lookups")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("normalize", parents=[common], help="abbreviate journals and clean up fields in .bib files, offline")
+    p.add_argument("bibs", nargs="+", help=".bib files to normalise in place")
+    p.add_argument("-o", "--output", help="write the result here instead (only with a single input)")
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser("rekey", parents=[common], help="give every entry of a .bib a key from --key-format, without collisions")
+    p.add_argument("bib", help="the .bib file to rekey in place")
+    p.add_argument("-o", "--output", help="write the result here instead")
+    p.add_argument("-r", "--report", help="write the old to new key mapping here (TSV)")
+    p.set_defaults(func=cmd_rekey)
+
+    p = sub.add_parser("add", parents=[common], help="fetch identifiers and append them to a library .bib with unique keys")
+    p.add_argument("library", help="the .bib library to append to")
+    p.add_argument("identifiers", nargs="+", help="DOIs, arXiv IDs, URLs or titles")
+    p.add_argument("-j", "--jobs", type=int, default=8, help="number of parallel lookups")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("cache", help="share the lookup cache between machines")
+    cache_sub = p.add_subparsers(dest="cache_command", required=True)
+    c = cache_sub.add_parser("export", parents=[common], help="write the cache to a compressed bundle")
+    c.add_argument("bundle", help="bundle file to write, e.g. lab-refs.qbcache.gz")
+    c.set_defaults(func=cmd_cache_export)
+    c = cache_sub.add_parser("import", parents=[common], help="merge bundles into the cache, newest fetch wins")
+    c.add_argument("bundles", nargs="+", help="bundle files to import")
+    c.set_defaults(func=cmd_cache_import)
+
+    return parser
+
+
+COMMANDS = frozenset({"scan-pdfs", "scan-tex", "import-crossref", "cache", "batch", "watch", "normalize", "rekey", "add"})
+
+
+def is_cli_invocation(argv) -> bool:
+    return len(argv) > 1 and argv[1] in COMMANDS
+
+
+def main(argv) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv[1:])
+    if args.key_format:
+        from . import keys
+        try:
+            keys.check_format(args.key_format)
+        except ValueError as e:
+            parser.error(str(e))
+        keys.key_format = args.key_format
+    if args.normalize:
+        from . import helpers
+        helpers.normalize_results = True
+    try:
+        return args.func(args)
+    finally:
+        if getattr(args, "metrics", None):
+            from .metrics import metrics
+            metrics.export(args.metrics)
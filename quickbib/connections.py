@@ -0,0 +1,109 @@
+"""Shared HTTP connection pool and start-up warm-up.
+
+doi2bib3 calls ``requests.get`` for every request, which opens a fresh
+connection (DNS, TCP and TLS) each time. :func:`install` points doi2bib3 at a
+single pooled ``requests.Session`` instead, and :func:`warm_up` opens
+connections to the resolver hosts in the background right after start-up,
+so the first lookup the user makes finds them ready.
+
+The shim also counts retries: a request made after an earlier request of
+the same lookup failed (an exception or an HTTP error status), such as
+doi2bib3 trying the next arXiv endpoint.
+"""
+import importlib
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import deadlines
+from .metrics import metrics
+
+# Hosts doi2bib3 talks to for DOI, CrossRef and arXiv lookups
+RESOLVER_HOSTS = (
+    "https://doi.org",
+    "https://api.crossref.org",
+    "http://export.arxiv.org",
+    "https://export.arxiv.org",
+)
+WARM_UP_TIMEOUT = 5
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=len(RESOLVER_HOSTS) * 2, pool_maxsize=16)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+_local = threading.local()
+
+
+def begin_lookup() -> None:
+    """Start counting retries for a new lookup on this thread."""
+    _local.failed = False
+    _local.retries = 0
+
+
+def lookup_retries() -> int:
+    """Retries made by the lookup on this thread since :func:`begin_lookup`."""
+    return getattr(_local, "retries", 0)
+
+
+class _RequestsShim:
+    """Stands in for the ``requests`` module inside doi2bib3."""
+
+    def get(self, url, **kwargs):
+        if getattr(_local, "failed", False):
+            _local.retries = lookup_retries() + 1
+        try:
+            response = deadlines.timed_get(session.get, url, **kwargs)
+        except Exception:
+            _local.failed = True
+            raise
+        _local.failed = response.status_code >= 400
+        return response
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def install() -> None:
+    """Route doi2bib3's HTTP requests through the shared session."""
+    shim = _RequestsShim()
+    for module in ("doi2bib3.backend", "doi2bib3.normalize"):
+        try:
+            mod = importlib.import_module(module)
+        except ImportError:
+            continue
+        if getattr(mod, "requests", None) is requests:
+            mod.requests = shim
+
+
+def is_offline(argv=()) -> bool:
+    """True when started with ``--offline`` or with QUICKBIB_OFFLINE set."""
+    return "--offline" in argv or os.environ.get("QUICKBIB_OFFLINE", "") not in ("", "0")
+
+
+def start_warm_up(argv=()) -> list:
+    """Warm up the resolver connections unless running offline; returns the started threads."""
+    if is_offline(argv):
+        return []
+    return warm_up()
+
+
+def _warm(host: str) -> None:
+    try:
+        # Any response leaves a kept-alive connection in the pool
+        session.head(host + "/", timeout=WARM_UP_TIMEOUT, allow_redirects=False).close()
+        metrics.inc("warm_ups", host=host, outcome="ok")
+    except requests.RequestException as e:
+        metrics.inc("warm_ups", host=host, outcome=type(e).__name__)
+
+
+def warm_up(hosts=RESOLVER_HOSTS) -> list:
+    """Open connections to ``hosts`` without blocking; returns the started threads."""
+    threads = []
+    for host in hosts:
+        t = threading.Thread(target=_warm, args=(host,), name="quickbib-warm-up", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
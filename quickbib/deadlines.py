@@ -0,0 +1,119 @@
+"""Time budgets for lookups.
+
+Every lookup runs under an overall deadline (:data:`LOOKUP_BUDGET`). Each
+HTTP request doi2bib3 makes on its behalf gets a timeout that is the
+smallest of:
+
+* the host's adaptive timeout, derived from the latencies observed for that
+  host (a multiple of the 95th percentile, within fixed bounds),
+* the share of the remaining budget allowed for its stage: identifier
+  resolution and title search may use part of it, so the final metadata
+  fetch always has time left.
+
+When the budget is spent, further requests fail at once with
+:class:`LookupTimeout`, so a hung upstream cannot hold a lookup, or a batch,
+indefinitely.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from .metrics import metrics
+
+LOOKUP_BUDGET = 30.0
+# Bounds for adaptive per-host timeouts; doi2bib3's own default is 15 s
+MIN_TIMEOUT = 3.0
+MAX_TIMEOUT = 15.0
+TIMEOUT_FACTOR = 3.0
+# Samples needed before a host's timeout adapts
+MIN_SAMPLES = 20
+SAMPLE_WINDOW = 200
+STAGE_SHARE = {"resolve": 0.5, "search": 0.5, "metadata": 1.0}
+
+
+class LookupTimeout(requests.Timeout):
+    """The lookup ran out of its time budget."""
+
+
+_local = threading.local()
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+
+@contextmanager
+def deadline(seconds: float = LOOKUP_BUDGET):
+    """Run the enclosed lookup under an overall deadline of ``seconds``."""
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = time.monotonic() + seconds
+    _local.timed_out = False
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def timed_out() -> bool:
+    """Whether a request of the current lookup hit a timeout."""
+    return getattr(_local, "timed_out", False)
+
+
+def stage(url: str) -> str:
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host in ("doi.org", "dx.doi.org") or "/transform/" in parsed.path:
+        return "metadata"
+    if host == "api.crossref.org" and "query" in parsed.query:
+        return "search"
+    if host == "api.crossref.org":
+        return "metadata"
+    return "resolve"
+
+
+def host_timeout(host: str) -> float:
+    samples = _latencies.get(host)
+    if not samples or len(samples) < MIN_SAMPLES:
+        return MAX_TIMEOUT
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return max(MIN_TIMEOUT, min(MAX_TIMEOUT, TIMEOUT_FACTOR * p95))
+
+
+def _record(host: str, seconds: float) -> None:
+    samples = _latencies.get(host)
+    if samples is None:
+        with _latencies_lock:
+            samples = _latencies.setdefault(host, deque(maxlen=SAMPLE_WINDOW))
+    samples.append(seconds)
+
+
+def timed_get(get, url, **kwargs):
+    """Call ``get(url, **kwargs)`` with a timeout fitted to the current budget."""
+    host = urlparse(url).netloc.lower()
+    timeout = host_timeout(host)
+    requested = kwargs.get("timeout")
+    if isinstance(requested, (int, float)):
+        timeout = min(timeout, requested)
+
+    end = getattr(_local, "deadline", None)
+    if end is not None:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            _local.timed_out = True
+            raise LookupTimeout("lookup time budget exhausted")
+        timeout = min(timeout, remaining * STAGE_SHARE[stage(url)])
+    kwargs["timeout"] = timeout
+
+    start = time.monotonic()
+    try:
+        response = get(url, **kwargs)
+    except requests.Timeout:
+        _local.timed_out = True
+        metrics.inc("timeouts", host=host)
+        _record(host, time.monotonic() - start)
+        raise
+    _record(host, time.monotonic() - start)
+    return response
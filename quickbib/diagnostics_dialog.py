@@ -0,0 +1,145 @@
+from PyQt6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QFileDialog,
+)
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt
+
+from .metrics import metrics, BUCKETS
+from .scheduler import scheduler
+
+SOURCES = ("doi", "arxiv", "title", "url")
+ROWS = (
+    ("Lookups", "lookups"),
+    ("Cache hits", "cache_hits"),
+    ("Negative cache hits", "negative_cache_hits"),
+    ("Cache misses", "cache_misses"),
+    ("Offline index hits", "offline_hits"),
+    ("Joined in-flight lookup", "deduplicated"),
+    ("Retried requests", "retries"),
+    ("Errors", "errors"),
+)
+
+
+def _percentile(hist, q):
+    """Approximate the q-quantile from bucket counts (upper bucket bound)."""
+    counts = hist[:-1]
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(list(BUCKETS) + [float("inf")], counts):
+        seen += count
+        if seen >= q * total:
+            return bound
+    return None
+
+
+class DiagnosticsDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("QuickBib diagnostics")
+        self.resize(640, 420)
+
+        vbox = QVBoxLayout()
+        vbox.setContentsMargins(12, 12, 12, 12)
+        vbox.setSpacing(8)
+        self.setLayout(vbox)
+
+        header = QLabel("Fetch statistics since start")
+        header_font = QFont()
+        header_font.setPointSize(14)
+        header_font.setBold(True)
+        header.setFont(header_font)
+        header.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        vbox.addWidget(header)
+
+        self.table = QTableWidget(len(ROWS) + 3, len(SOURCES))
+        self.table.setHorizontalHeaderLabels([s.upper() if s != "title" else "Title" for s in SOURCES])
+        self.table.setVerticalHeaderLabels(
+            [label for label, _ in ROWS] + ["Mean latency", "p50 latency", "p95 latency"]
+        )
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        vbox.addWidget(self.table)
+
+        self.errors = QLabel("")
+        self.errors.setWordWrap(True)
+        vbox.addWidget(self.errors)
+
+        self.queue = QLabel("")
+        self.queue.setWordWrap(True)
+        vbox.addWidget(self.queue)
+
+        btn_hbox = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        btn_hbox.addWidget(refresh_btn)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export)
+        btn_hbox.addWidget(export_btn)
+        btn_hbox.addStretch()
+        close_btn = QPushButton("✕ Close")
+        close_btn.setFixedHeight(28)
+        close_btn.clicked.connect(self.reject)
+        btn_hbox.addWidget(close_btn)
+        vbox.addLayout(btn_hbox)
+
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+    def refresh(self):
+        snap = metrics.snapshot()
+        totals = {}
+        error_classes = {}
+        for (name, labels), value in snap["counters"].items():
+            labels = dict(labels)
+            key = (name, labels.get("source"))
+            totals[key] = totals.get(key, 0) + value
+            if name == "errors":
+                error_classes[labels.get("error")] = error_classes.get(labels.get("error"), 0) + value
+
+        for col, source in enumerate(SOURCES):
+            for row, (_, name) in enumerate(ROWS):
+                self.table.setItem(row, col, QTableWidgetItem(str(totals.get((name, source), 0))))
+            hist = snap["histograms"].get(("lookup_seconds", (("source", source),)))
+            count = sum(hist[:-1]) if hist else 0
+            cells = ["–", "–", "–"]
+            if count:
+                cells[0] = f"{hist[-1] / count * 1000:.0f} ms"
+                for i, q in enumerate((0.5, 0.95), 1):
+                    bound = _percentile(hist, q)
+                    cells[i] = f"≤ {bound * 1000:.0f} ms" if bound != float("inf") else f"> {BUCKETS[-1]:.0f} s"
+            for i, text in enumerate(cells):
+                self.table.setItem(len(ROWS) + i, col, QTableWidgetItem(text))
+
+        if error_classes:
+            self.errors.setText("Error classes: " + ", ".join(
+                f"{name} ({count})" for name, count in sorted(error_classes.items())))
+        else:
+            self.errors.setText("No errors recorded.")
+
+        waits = scheduler.wait_stats()
+        self.queue.setText(f"Queued: {scheduler.queued()}. Queue wait (mean / max): " + ", ".join(
+            f"{name} {w['mean'] * 1000:.0f} / {w['max'] * 1000:.0f} ms ({w['count']})"
+            for name, w in waits.items()))
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export metrics", "quickbib-metrics.json",
+            "JSON (*.json);;Prometheus text (*.prom)")
+        if path:
+            try:
+                metrics.export(path)
+            except OSError as e:
+                self.errors.setText(f"Export failed: {e}")
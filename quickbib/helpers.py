@@ -1,13 +1,145 @@
 #!/usr/bin/env python3
+import os
+import threading
+import time
+
 from doi2bib3 import fetch_bibtex
 
+from . import cache, connections, deadlines, keys, offline_index
+from .identifiers import classify
+from .metrics import metrics
 
-def get_bibtex_for_doi(doi: str):
-    try:
-        bibtex = fetch_bibtex(doi)
+# doi2bib3 makes one to three requests per lookup. Stay well inside what
+# CrossRef asks of anonymous clients, even when many lookups run at once.
+REQUESTS_PER_SECOND = 5
+BURST = 10
+
+
+class RateLimiter:
+    """Token bucket shared by every thread in the process."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, wait: bool = True) -> None:
+        """Take a token, sleeping until one is available unless ``wait`` is False."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Take the token now, possibly going into debt, and sleep off the
+            # debt outside the lock so waiters queue up in arrival order.
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 and wait else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+rate_limiter = RateLimiter(REQUESTS_PER_SECOND, BURST)
+
+# Reuse pooled (and possibly pre-warmed) connections for every lookup
+connections.install()
+
+# Rewrite results in journal house style (quickbib.normalize) before returning
+# them. The cache keeps what was fetched, so this can be switched at any time.
+normalize_results = os.environ.get("QUICKBIB_NORMALIZE", "") not in ("", "0")
+
+# Lookups currently on the network, so concurrent callers asking for the same
+# identifier wait for one fetch instead of starting their own.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+def _count_retries(source: str) -> None:
+    retries = connections.lookup_retries()
+    if retries:
+        metrics.inc("retries", retries, source=source)
+
+
+def _lookup(doi: str, source: str, interactive: bool):
+    # A local CrossRef dump, if one was imported, answers without network
+    bibtex = offline_index.lookup(doi)
+    if bibtex is not None:
+        metrics.inc("offline_hits", source=source)
         return True, bibtex, None
+
+    # The user is waiting on interactive lookups: they still count against
+    # the budget but never sleep behind queued batch work.
+    rate_limiter.acquire(wait=not interactive)
+    start = time.perf_counter()
+    connections.begin_lookup()
+    try:
+        with deadlines.deadline():
+            bibtex = fetch_bibtex(doi)
     except Exception as e:
+        _count_retries(source)
+        elapsed = time.perf_counter() - start
+        metrics.observe("lookup_seconds", elapsed, source=source)
+        metrics.inc("errors", source=source, error=type(e).__name__)
+        if deadlines.timed_out():
+            # doi2bib3 sometimes reports a timed out search as "not found"
+            return False, "", f"Timed out after {elapsed:.0f} s"
+        if isinstance(e, OSError):
+            # Connection problems (requests' errors are OSErrors) say nothing
+            # about the identifier, so they are not remembered.
+            return False, "", str(e)
+        cache.put(doi, False, "", str(e))
         return False, "", str(e)
+    _count_retries(source)
+    metrics.observe("lookup_seconds", time.perf_counter() - start, source=source)
+    cache.put(doi, True, bibtex)
+    return True, bibtex, None
+
+
+def get_bibtex_for_doi(doi: str, interactive: bool = False):
+    found, bibtex, error = _get_bibtex(doi, interactive)
+    if found and normalize_results:
+        from .normalize import normalize_bib
+        bibtex = normalize_bib(bibtex)[0]
+    if found and keys.key_format:
+        bibtex = keys.apply_format(bibtex, keys.key_format)
+    return found, bibtex, error
+
+
+def _get_bibtex(doi: str, interactive: bool):
+    source = classify(doi)
+    metrics.inc("lookups", source=source)
+    cached = cache.get(doi)
+    if cached is not None:
+        metrics.inc("cache_hits" if cached[0] else "negative_cache_hits", source=source)
+        return cached
+    metrics.inc("cache_misses", source=source)
+
+    key = cache.cache_key(doi)
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+    if not leader:
+        metrics.inc("deduplicated", source=source)
+        flight.done.wait()
+        return flight.result
+
+    try:
+        flight.result = _lookup(doi, source, interactive)
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        if flight.result is None:
+            flight.result = (False, "", "lookup failed")
+        flight.done.set()
+    return flight.result
 
 
 def copy_to_clipboard(text: str) -> bool:
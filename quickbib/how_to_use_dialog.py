@@ -10,6 +10,23 @@ from PyQt6.QtGui import QFont, QTextCharFormat, QColor, QSyntaxHighlighter, QFon
 from PyQt6.QtCore import Qt, QRegularExpression
 
 
+# A simple highlighter to apply to each example code widget
+class SimpleHighlighter(QSyntaxHighlighter):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rules = []
+        # Strings format
+        str_fmt = QTextCharFormat()
+        str_fmt.setForeground(QColor('#008000'))
+        self.rules.append((QRegularExpression(r'".*?"'), str_fmt))
+        self.rules.append((QRegularExpression(r"'.*?'"), str_fmt))
+
+        # URLs (simple)
+        url_fmt = QTextCharFormat()
+        url_fmt.setForeground(QColor('#0000FF'))
+        self.rules.append((QRegularExpression(r'https?://[^\s]+'), url_fmt))
+
+
 class HowToUseDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -54,25 +71,9 @@ class HowToUseDialog(QDialog):
             ("arXiv ID (short)", "2411.08091"),
             ("Old arXiv ID", "hep-th/9901001"),
             ("Journal URL (works with APS, AMS, ACS, PNAS, Nature...)", "https://journals.aps.org/prl/abstract/10.1103/v6r7-4ph9"),
-            ("Title (fuzzy search)", "Projected Topological Branes"),
+            ("Title (fuzzy search; pick from the best matches)", "Projected Topological Branes"),
         ]
 
-        # Define a simple highlighter to apply to each example code widget
-        class SimpleHighlighter(QSyntaxHighlighter):
-            def __init__(self, parent=None):
-                super().__init__(parent)
-                self.rules = []
-                # Strings format
-                str_fmt = QTextCharFormat()
-                str_fmt.setForeground(QColor('#008000'))
-                self.rules.append((QRegularExpression(r'".*?"'), str_fmt))
-                self.rules.append((QRegularExpression(r"'.*?'"), str_fmt))
-
-                # URLs (simple)
-                url_fmt = QTextCharFormat()
-                url_fmt.setForeground(QColor('#0000FF'))
-                self.rules.append((QRegularExpression(r'https?://[^\s]+'), url_fmt))
-
         # Create code widgets for each example and attach the highlighter
         for label_text, example_text in examples:
             lbl = QLabel(label_text)
@@ -0,0 +1,94 @@
+"""Patterns for spotting DOIs and arXiv IDs inside free text.
+
+The patterns are written once as strings and compiled for both ``str`` and
+``bytes`` so the same rules apply to LaTeX sources and raw PDF data.
+"""
+import re
+
+# Characters that commonly delimit an identifier in running text
+_STOP = r"\s\"'<>(){}\[\]\\"
+
+DOI_PATTERN = r"10\.\d{4,9}/[^" + _STOP + r"]+"
+# New-style (2007+) and old-style arXiv IDs. They are only recognised behind
+# an explicit "arXiv:" prefix or an arxiv.org URL, because a bare "1234.5678"
+# is far too common in documents to be trusted on its own.
+ARXIV_ID_PATTERN = r"(?:\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?"
+ARXIV_PATTERN = (
+    r"(?:arxiv:\s*|arxiv\.org/(?:abs|pdf)/)(" + ARXIV_ID_PATTERN + r")"
+)
+
+DOI_RE = re.compile(DOI_PATTERN)
+ARXIV_RE = re.compile(ARXIV_PATTERN, re.IGNORECASE)
+DOI_BYTES_RE = re.compile(DOI_PATTERN.encode("ascii"))
+ARXIV_BYTES_RE = re.compile(ARXIV_PATTERN.encode("ascii"), re.IGNORECASE)
+
+# Punctuation that ends a sentence rather than the identifier itself
+_TRAILING = ".,;:"
+
+
+def clean_doi(doi: str) -> str:
+    """Strip trailing punctuation and a ``.pdf`` suffix from a matched DOI."""
+    doi = doi.rstrip(_TRAILING)
+    if doi.lower().endswith(".pdf"):
+        doi = doi[:-4]
+    return doi
+
+
+def clean_arxiv_id(arxiv_id: str) -> str:
+    """Return an arXiv ID in the ``arXiv:<id>`` form understood by doi2bib3."""
+    arxiv_id = arxiv_id.rstrip(_TRAILING)
+    if arxiv_id.lower().endswith(".pdf"):
+        arxiv_id = arxiv_id[:-4]
+    return f"arXiv:{arxiv_id}"
+
+
+_BARE_DOI_RE = re.compile(r"^10\.\d{4,9}/\S+$")
+_DOI_PREFIXES = ("doi:", "https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/")
+
+
+def parse_doi(identifier: str):
+    """Return the DOI if ``identifier`` is a bare DOI or doi.org link, else None."""
+    candidate = identifier.strip()
+    lower = candidate.lower()
+    for prefix in _DOI_PREFIXES:
+        if lower.startswith(prefix):
+            candidate = candidate[len(prefix):].strip()
+            break
+    return candidate if _BARE_DOI_RE.match(candidate) else None
+
+
+_ARXIV_ONLY_RE = re.compile(r"^(?:arxiv:\s*)?" + ARXIV_ID_PATTERN + r"$", re.IGNORECASE)
+
+
+def classify(identifier: str) -> str:
+    """Say what kind of input ``identifier`` is: doi, arxiv, url or title."""
+    candidate = identifier.strip()
+    if parse_doi(candidate):
+        return "doi"
+    if _ARXIV_ONLY_RE.match(candidate) or ARXIV_RE.search(candidate):
+        return "arxiv"
+    if candidate.lower().startswith(("http://", "https://")):
+        return "url"
+    return "title"
+
+
+def find_identifiers(text):
+    """Return the DOIs and arXiv IDs found in ``text`` in order of appearance.
+
+    ``text`` may be ``str`` or ``bytes``; the result is always a list of
+    ``str`` without duplicates.
+    """
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        doi_re, arxiv_re = DOI_BYTES_RE, ARXIV_BYTES_RE
+        decode = lambda b: b.decode("ascii", "replace")
+    else:
+        doi_re, arxiv_re = DOI_RE, ARXIV_RE
+        decode = lambda s: s
+
+    found = []
+    for m in doi_re.finditer(text):
+        found.append((m.start(), clean_doi(decode(m.group(0)))))
+    for m in arxiv_re.finditer(text):
+        found.append((m.start(), clean_arxiv_id(decode(m.group(1)))))
+    found.sort()
+    return list(dict.fromkeys(ident for _, ident in found))
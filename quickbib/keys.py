@@ -0,0 +1,314 @@
+"""Citation keys from a configurable format, without collisions.
+
+A key format is a string of placeholders and literal text, for example
+``{author}{year}{firstword}`` (the default) giving ``einstein1935can``.
+Placeholders:
+
+* ``author`` - last name of the first author,
+* ``authors`` - last names of up to three authors,
+* ``year`` - year of publication,
+* ``firstword`` - first significant word of the title,
+* ``shorttitle`` - first three significant words of the title.
+
+Values are plain ASCII, lower case; a capitalised placeholder such as
+``{Author}`` capitalises its words.
+
+When a key is taken, ``a``, ``b``, ... ``z``, ``aa``, ... is appended, so
+the outcome depends only on the order entries are added in. A work that is
+already in the library (same DOI, or same author, year and title) gets its
+existing key back. For a library file the keys are kept in an SQLite index
+in the cache directory, so adding an entry costs a few index lookups
+however large the library is; the index is rebuilt only when the file was
+changed by something else.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import string
+import unicodedata
+
+from . import bibfile
+from .app_info import CACHE_DIR
+
+DEFAULT_FORMAT = "{author}{year}{firstword}"
+PLACEHOLDERS = ("author", "authors", "year", "firstword", "shorttitle")
+KEYS_DIR = CACHE_DIR / "keys"
+
+# Key format applied to fetched entries and written .bib files; None keeps
+# the keys the entries come with.
+key_format = os.environ.get("QUICKBIB_KEY_FORMAT") or None
+
+STOPWORDS = frozenset(
+    "a an and are as at by for from in into is of on or over the to under via with".split()
+)
+_LATEX_LETTERS = {"ss": "ss", "ae": "ae", "AE": "AE", "oe": "oe", "OE": "OE", "o": "o", "O": "O",
+                  "l": "l", "L": "L", "i": "i", "j": "j", "aa": "aa", "AA": "AA"}
+_LATEX_COMMAND_RE = re.compile(r"\\([A-Za-z]+)\s*|\\.")
+_NON_ALNUM_RE = re.compile(r"[^A-Za-z0-9]+")
+_YEAR_RE = re.compile(r"\d{4}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, identity TEXT NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS keys_identity ON keys (identity);
+CREATE TABLE IF NOT EXISTS library (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);
+"""
+
+
+def check_format(fmt: str) -> None:
+    """Raise ValueError if ``fmt`` uses an unknown placeholder."""
+    for _, name, _, _ in string.Formatter().parse(fmt):
+        if name is not None and name.lower() not in PLACEHOLDERS:
+            raise ValueError(f"unknown key placeholder {{{name}}}; use one of: {', '.join(PLACEHOLDERS)}")
+
+
+def _plain_words(text: str) -> list:
+    """ASCII words of a BibTeX value, with LaTeX accents and braces removed."""
+    text = _LATEX_COMMAND_RE.sub(lambda m: _LATEX_LETTERS.get(m.group(1) or "", ""), text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub(" ", text.replace("{", "").replace("}", "")).split()
+
+
+def _last_names(author_field: str, limit: int) -> list:
+    names = []
+    for author in re.split(r"\s+and\s+", author_field.strip())[:limit]:
+        if "," in author:
+            words = _plain_words(author.split(",", 1)[0])
+        else:
+            words = _plain_words(author)[-1:]
+        if words:
+            names.append("".join(words))
+    return names
+
+
+def _title_words(title: str) -> list:
+    return [w for w in _plain_words(title) if w.lower() not in STOPWORDS]
+
+
+def _values(fields: dict) -> dict:
+    year = _YEAR_RE.search(fields.get("year") or fields.get("date") or "")
+    title_words = _title_words(fields.get("title", ""))
+    return {
+        "author": _last_names(fields.get("author") or fields.get("editor") or "", 1),
+        "authors": _last_names(fields.get("author") or fields.get("editor") or "", 3),
+        "year": [year.group()] if year else [],
+        "firstword": title_words[:1],
+        "shorttitle": title_words[:3],
+    }
+
+
+def make_key(fields: dict, fmt: str = DEFAULT_FORMAT) -> str:
+    """The key ``fmt`` gives for an entry with ``fields``; never empty."""
+    values = _values(fields)
+    parts = []
+    for literal, name, _, _ in string.Formatter().parse(fmt):
+        parts.append(literal)
+        if name is None:
+            continue
+        words = values.get(name.lower(), [])
+        if name[:1].isupper():
+            parts.append("".join(w[:1].upper() + w[1:].lower() for w in words))
+        else:
+            parts.append("".join(words).lower())
+    key = re.sub(r"[\s,{}()=#%\"'\\]", "", "".join(parts))
+    return key or "entry"
+
+
+def apply_format(bibtex: str, fmt: str = DEFAULT_FORMAT) -> str:
+    """Replace the key of the (first) entry in ``bibtex`` by the one ``fmt`` gives."""
+    stripped = bibtex.lstrip()
+    entry = bibfile.parse_entry(stripped)
+    if entry is None or entry.type in bibfile.SPECIAL_TYPES:
+        return bibtex
+    return bibfile.replace_key(stripped, make_key(entry.fields, fmt))
+
+
+def identity(fields: dict) -> str:
+    """What makes two entries the same work: the DOI, else author, year and title."""
+    doi = fields.get("doi", "").strip().lower()
+    if doi:
+        return "doi:" + doi
+    eprint = fields.get("eprint", "").strip().lower()
+    if eprint:
+        return "eprint:" + eprint
+    values = _values(fields)
+    basis = "\0".join(["".join(values["authors"]).lower(), "".join(values["year"]),
+                       " ".join(_plain_words(fields.get("title", ""))).lower()])
+    return "hash:" + hashlib.blake2b(basis.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _suffixes():
+    """a, b, ..., z, aa, ab, ... in order."""
+    width = 1
+    while True:
+        n = 26 ** width
+        for i in range(n):
+            s = ""
+            for _ in range(width):
+                i, r = divmod(i, 26)
+                s = chr(ord("a") + r) + s
+            yield s
+        width += 1
+
+
+class KeyIndex:
+    """The keys in use, with the work each belongs to."""
+
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.fspath(path)) or ".", exist_ok=True)
+        self.db = sqlite3.connect(os.fspath(path))
+        self.db.executescript(_SCHEMA)
+
+    def add(self, key: str, ident: str) -> None:
+        """Record an existing key; the first entry seen with a key keeps it."""
+        self.db.execute("INSERT OR IGNORE INTO keys VALUES (?, ?)", (key, ident))
+
+    def key_for(self, ident: str):
+        row = self.db.execute("SELECT key FROM keys WHERE identity = ? LIMIT 1", (ident,)).fetchone()
+        return row[0] if row else None
+
+    def taken(self, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def assign(self, fields: dict, fmt: str = DEFAULT_FORMAT, reuse: bool = True, key=None) -> str:
+        """Return a free key for an entry with ``fields`` and reserve it.
+
+        With ``reuse``, a work already in the index gets its existing key.
+        Without a format (``fmt=None``) the entry's own ``key`` is kept, and
+        only suffixed if it is taken.
+        """
+        ident = identity(fields)
+        if reuse:
+            existing = self.key_for(ident)
+            if existing is not None:
+                return existing
+        base = key if fmt is None and key else make_key(fields, fmt or DEFAULT_FORMAT)
+        key = base
+        if self.taken(key):
+            for suffix in _suffixes():
+                key = base + suffix
+                if not self.taken(key):
+                    break
+        self.add(key, ident)
+        return key
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def rollback(self) -> None:
+        """Give back the keys reserved since the last commit."""
+        self.db.rollback()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+
+def rekey_entry(chunk: str, index: KeyIndex, fmt: str = DEFAULT_FORMAT, reuse: bool = True):
+    """Return ``(new_chunk, old_key, new_key)`` for an entry chunk."""
+    entry = bibfile.parse_entry(chunk)
+    if entry is None or entry.type in bibfile.SPECIAL_TYPES:
+        return chunk, None, None
+    key = index.assign(entry.fields, fmt, reuse=reuse)
+    return bibfile.replace_key(chunk, key), entry.key, key
+
+
+def rekey_bib(text: str, fmt: str = DEFAULT_FORMAT):
+    """Give every entry in ``text`` a key from ``fmt``, in file order.
+
+    Returns ``(new_text, mapping)`` with ``mapping`` a list of
+    ``(old_key, new_key)`` pairs. Duplicate entries of one work keep
+    distinct keys so no ``\\cite`` becomes ambiguous.
+    """
+    index = KeyIndex()
+    chunks = bibfile.split(text)
+    mapping = []
+    for i, chunk in enumerate(chunks):
+        if chunk.startswith("@"):
+            chunks[i], old, new = rekey_entry(chunk, index, fmt, reuse=False)
+            if new is not None:
+                mapping.append((old, new))
+    index.close()
+    return "".join(chunks), mapping
+
+
+def assign_keys(entries, fmt: str = DEFAULT_FORMAT) -> list:
+    """Rekey a list of BibTeX strings (e.g. a batch result) collision-free."""
+    index = KeyIndex()
+    out = [rekey_entry(e.strip(), index, fmt, reuse=False)[0] for e in entries]
+    index.close()
+    return out
+
+
+def _index_path(library) -> str:
+    digest = hashlib.sha256(os.path.abspath(os.fspath(library)).encode("utf-8")).hexdigest()[:16]
+    return str(KEYS_DIR / f"{digest}.sqlite3")
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0, 0
+    return st.st_size, st.st_mtime_ns
+
+
+def library_index(library, index_path=None) -> KeyIndex:
+    """Open the key index of .bib file ``library``, rebuilding it if the file changed."""
+    library = os.path.abspath(os.fspath(library))
+    index = KeyIndex(index_path or _index_path(library))
+    size, mtime_ns = _stat(library)
+    row = index.db.execute("SELECT size, mtime_ns FROM library WHERE path = ?", (library,)).fetchone()
+    if row != (size, mtime_ns):
+        index.db.execute("DELETE FROM keys")
+        if size:
+            with open(library, "r", encoding="utf-8", newline="") as f:
+                for chunk in bibfile.split(f.read()):
+                    entry = bibfile.parse_entry(chunk) if chunk.startswith("@") else None
+                    if entry is not None and entry.key and entry.type not in bibfile.SPECIAL_TYPES:
+                        index.add(entry.key, identity(entry.fields))
+        index.db.execute("INSERT OR REPLACE INTO library VALUES (?, ?, ?)", (library, size, mtime_ns))
+        index.commit()
+    return index
+
+
+def add_to_library(library, entries, fmt: str = DEFAULT_FORMAT, index_path=None) -> list:
+    """Append BibTeX ``entries`` to ``library`` with collision-free keys.
+
+    With ``fmt=None`` entries keep their own keys unless these are taken.
+    Works already in the library are not added again. Returns one
+    ``(key, added)`` pair per entry.
+    """
+    library = os.path.abspath(os.fspath(library))
+    index = library_index(library, index_path)
+    try:
+        results = []
+        blocks = []
+        for bibtex in entries:
+            entry = bibfile.parse_entry(bibtex.strip())
+            if entry is None:
+                continue
+            existing = index.key_for(identity(entry.fields))
+            if existing is not None:
+                results.append((existing, False))
+                continue
+            key = index.assign(entry.fields, fmt, key=entry.key)
+            blocks.append(bibfile.replace_key(bibtex.strip(), key))
+            results.append((key, True))
+        if blocks:
+            size, _ = _stat(library)
+            with open(library, "a", encoding="utf-8", newline="") as f:
+                f.write(("\n" if size else "") + "\n\n".join(blocks) + "\n")
+            # Our own append must not make the next call rebuild the index
+            size, mtime_ns = _stat(library)
+            index.db.execute("INSERT OR REPLACE INTO library VALUES (?, ?, ?)", (library, size, mtime_ns))
+        index.commit()
+    except BaseException:
+        # The entries did not reach the library, so their keys are not taken
+        index.rollback()
+        raise
+    finally:
+        index.close()
+    return results
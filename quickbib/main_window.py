@@ -14,14 +14,25 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QFrame,
     QStyle,
+    QFileDialog,
+    QListWidget,
+    QInputDialog,
 )
 from PyQt6.QtGui import QAction, QPixmap, QFont, QIcon
-from PyQt6.QtCore import QObject, pyqtSignal, Qt
-
-from .helpers import get_bibtex_for_doi, copy_to_clipboard
+from PyQt6.QtCore import QObject, QSettings, QTimer, pyqtSignal, Qt
+
+from . import helpers, keys, memory_debug
+from .helpers import copy_to_clipboard
+from .scheduler import INTERACTIVE, scheduler
+from .deadlines import LOOKUP_BUDGET
+from .identifiers import classify
+from .search import search_async
+from .batch import combine_bibtex, write_bib
+from .pdf_scan import build_bibliography
 from .about_dialog import AboutDialog
 from .how_to_use_dialog import HowToUseDialog
-from .app_info import LICENSE_PATH
+from .diagnostics_dialog import DiagnosticsDialog
+from .app_info import APP_NAME, LICENSE_PATH
 
 
 class FetchWorker(QObject):
@@ -32,13 +43,71 @@ class FetchWorker(QObject):
         self.doi = doi
 
     def run(self):
+        # Interactive lookups jump ahead of any batch work on the shared scheduler
+        future = scheduler.submit(self.doi, INTERACTIVE)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
         try:
-            found, bibtex, error = get_bibtex_for_doi(self.doi)
+            found, bibtex, error = future.result()
         except Exception as e:
             found, bibtex, error = False, "", str(e)
         self.finished.emit(found, bibtex, error)
 
 
+class SearchWorker(QObject):
+    finished = pyqtSignal(list, object)  # ranked candidates, error
+
+    def __init__(self, query: str):
+        super().__init__()
+        self.query = query
+
+    def run(self):
+        # Runs on the shared scheduler; no thread waits for the result
+        future = search_async(self.query)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        try:
+            candidates, error = future.result(), None
+        except Exception as e:
+            candidates, error = [], str(e)
+        self.finished.emit(candidates, error)
+
+
+class FolderScanWorker(QObject):
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(list, list)  # bibtex entries, (path, reason) pairs
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+
+    def run(self):
+        try:
+            entries, missing = build_bibliography(self.paths, progress=self.progress.emit)
+        except Exception as e:
+            entries, missing = [], [("", str(e))]
+        self.finished.emit(entries, missing)
+
+
+class LibraryWorker(QObject):
+    finished = pyqtSignal(list, object)  # (key, added) pairs, error
+
+    def __init__(self, library: str, bibtex: str, key_format):
+        super().__init__()
+        self.library = library
+        self.bibtex = bibtex
+        self.key_format = key_format
+
+    def run(self):
+        try:
+            results, error = keys.add_to_library(self.library, [self.bibtex], self.key_format), None
+        except Exception as e:
+            results, error = [], str(e)
+        self.finished.emit(results, error)
+
+
 class QuickBibWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -54,6 +123,14 @@ class QuickBibWindow(QMainWindow):
         # Menu bar
         menubar = self.menuBar()
         file_menu = menubar.addMenu("&File")
+        add_action = QAction("&Add to library", self)
+        add_action.setShortcut("Ctrl+L")
+        add_action.triggered.connect(self.add_to_library)
+        file_menu.addAction(add_action)
+        library_action = QAction("Choose &library...", self)
+        library_action.triggered.connect(self.choose_library)
+        file_menu.addAction(library_action)
+        file_menu.addSeparator()
         quit_action = QAction("&Quit", self)
         quit_action.triggered.connect(self.close)
         file_menu.addAction(quit_action)
@@ -64,6 +141,16 @@ class QuickBibWindow(QMainWindow):
         copy_action.triggered.connect(self.copy_to_clipboard)
         edit_menu.addAction(copy_action)
 
+        normalize_action = QAction("&Normalize entries (journal abbreviations, offline)", self)
+        normalize_action.setCheckable(True)
+        normalize_action.setChecked(helpers.normalize_results)
+        normalize_action.toggled.connect(self.set_normalize)
+        edit_menu.addAction(normalize_action)
+
+        key_format_action = QAction("Citation &key format...", self)
+        key_format_action.triggered.connect(self.choose_key_format)
+        edit_menu.addAction(key_format_action)
+
         help_menu = menubar.addMenu("&Help")
         about_action = QAction("&About", self)
         about_action.triggered.connect(self.show_about)
@@ -73,6 +160,15 @@ class QuickBibWindow(QMainWindow):
         howto_action.triggered.connect(self.show_how_to_use)
         help_menu.addAction(howto_action)
 
+        diagnostics_action = QAction("&Diagnostics", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        help_menu.addAction(diagnostics_action)
+
+        if memory_debug.enabled():
+            memory_action = QAction("Dump &memory usage", self)
+            memory_action.triggered.connect(self.dump_memory)
+            help_menu.addAction(memory_action)
+
         # DOI entry
         entry_box = QHBoxLayout()
         vbox.addLayout(entry_box)
@@ -95,6 +191,14 @@ class QuickBibWindow(QMainWindow):
         self.status.setAlignment(Qt.AlignmentFlag.AlignLeft)
         vbox.addWidget(self.status)
 
+        # Ranked candidates of a title search; picking one needs no network
+        self.candidates = QListWidget()
+        self.candidates.setMaximumHeight(110)
+        self.candidates.currentRowChanged.connect(self.on_candidate_selected)
+        self.candidates.hide()
+        vbox.addWidget(self.candidates)
+        self._candidates = []
+
         # Text view
         self.textview = QTextEdit()
         self.textview.setReadOnly(True)
@@ -113,14 +217,108 @@ class QuickBibWindow(QMainWindow):
 
         # Keep references to worker/thread so they don't get GC'd
         self._worker_thread = None
+        self._scan_thread = None
+        self._library_thread = None
+        # Every lookup still running, superseded ones included; a worker must
+        # outlive its queued result, and is deleted once that has arrived.
+        self._workers = set()
+        # The lookup has its own deadline; this only guards against a lookup
+        # stuck outside HTTP (e.g. DNS) so the window never waits forever.
+        # One timer, restarted per fetch, so finished lookups leave nothing behind.
+        self._fetch_deadline = QTimer(self)
+        self._fetch_deadline.setSingleShot(True)
+        self._fetch_deadline.setInterval(int((LOOKUP_BUDGET + 10) * 1000))
+        self._fetch_deadline.timeout.connect(self._fetch_timed_out)
+
+        # Preferences that outlive the session; the environment still wins
+        self.settings = QSettings(APP_NAME, APP_NAME)
+        if not helpers.normalize_results and self.settings.value("normalize", False, type=bool):
+            normalize_action.setChecked(True)
+        if keys.key_format is None:
+            keys.key_format = self.settings.value("key_format", "", type=str) or None
+
+        # Help dialogs are built on first use and then reused
+        self._about_dialog = None
+        self._how_to_use_dialog = None
+        self._diagnostics_dialog = None
+
+        # Folders or PDFs dropped on the window are scanned for identifiers
+        self.setAcceptDrops(True)
+
+    def set_normalize(self, enabled: bool):
+        # Applies from the next lookup on; cached entries are normalised too
+        helpers.normalize_results = enabled
+        self.settings.setValue("normalize", enabled)
+
+    def choose_key_format(self):
+        fmt, ok = QInputDialog.getText(
+            self, "Citation key format",
+            "Key format (empty keeps the keys entries come with).\n"
+            "Placeholders: " + ", ".join("{%s}" % p for p in keys.PLACEHOLDERS),
+            text=keys.key_format or keys.DEFAULT_FORMAT)
+        if not ok:
+            return
+        fmt = fmt.strip()
+        try:
+            keys.check_format(fmt)
+        except ValueError as e:
+            self.status.setText(f"Error: {e}")
+            return
+        keys.key_format = fmt or None
+        self.settings.setValue("key_format", fmt)
+        self.status.setText(f"Key format: {fmt}" if fmt else "Keeping keys as fetched.")
+
+    def choose_library(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Library to add entries to", self.settings.value("library", "references.bib", type=str),
+            "BibTeX files (*.bib)", options=QFileDialog.Option.DontConfirmOverwrite)
+        if path:
+            self.settings.setValue("library", path)
+        return path
+
+    def add_to_library(self):
+        bibtex = self.textview.toPlainText().strip()
+        if not bibtex.startswith("@") or self._library_thread is not None:
+            self.status.setText("Nothing to add.")
+            return
+        library = self.settings.value("library", "", type=str) or self.choose_library()
+        if not library:
+            return
+        # No key format: the entry keeps its key, suffixed only on a collision
+        worker = LibraryWorker(library, bibtex, keys.key_format)
+        worker.finished.connect(self.on_library_finished)
+        t = threading.Thread(target=worker.run, daemon=True)
+        t.start()
+        self._library_thread = (worker, t)
+
+    def on_library_finished(self, results: list, error: object):
+        library = Path(self._library_thread[0].library).name
+        self._library_thread = None
+        if error:
+            self.status.setText(f"Error: could not add to {library}: {error}")
+        elif results and results[0][1]:
+            self.status.setText(f"✅ Added to {library} as {results[0][0]}.")
+        elif results:
+            self.status.setText(f"Already in {library} as {results[0][0]}.")
 
     def show_about(self):
-        dlg = AboutDialog(self)
-        dlg.exec()
+        if self._about_dialog is None:
+            self._about_dialog = AboutDialog(self)
+        self._about_dialog.exec()
 
     def show_how_to_use(self):
-        dlg = HowToUseDialog(self)
-        dlg.exec()
+        if self._how_to_use_dialog is None:
+            self._how_to_use_dialog = HowToUseDialog(self)
+        self._how_to_use_dialog.exec()
+
+    def show_diagnostics(self):
+        if self._diagnostics_dialog is None:
+            self._diagnostics_dialog = DiagnosticsDialog(self)
+        self._diagnostics_dialog.exec()
+
+    def dump_memory(self):
+        memory_debug.dump()
+        self.status.setText("Memory report written to stderr.")
 
     def fetch_bibtex(self):
         doi = self.doi_entry.text().strip()
@@ -130,20 +328,47 @@ class QuickBibWindow(QMainWindow):
 
         self.status.setText("Fetching BibTeX...")
         self.textview.clear()
+        self._show_candidates([])
 
-        worker = FetchWorker(doi)
-
-        def thread_target():
+        if classify(doi) == "title":
+            worker = SearchWorker(doi)
+            worker.finished.connect(self.on_search_finished)
+            self._start_lookup(worker)
+            worker.run()
+        else:
+            worker = FetchWorker(doi)
+            worker.finished.connect(self.on_fetch_finished)
+            self._start_lookup(worker)
             worker.run()
 
-        worker.finished.connect(self.on_fetch_finished)
-
-        t = threading.Thread(target=thread_target, daemon=True)
-        t.start()
+    def _start_lookup(self, worker):
+        # Registered before it runs: a cached result can be delivered at once
+        self._worker_thread = worker
+        self._workers.add(worker)
+        self._fetch_deadline.start()
 
-        self._worker_thread = (worker, t)
+    def _fetch_timed_out(self):
+        if self._worker_thread is not None:
+            self._worker_thread = None
+            self.textview.clear()
+            self.status.setText(f"Error: Timed out after {LOOKUP_BUDGET + 10:.0f} s.")
+
+    def _finish_worker(self) -> bool:
+        """Release the worker that sent the current signal; False if its result is stale."""
+        worker = self.sender()
+        if worker in self._workers:
+            # Nothing else refers to a worker once it has reported
+            self._workers.discard(worker)
+            worker.deleteLater()
+        if worker is not self._worker_thread:
+            # A result that arrives after a timeout or a newer lookup
+            return False
+        self._fetch_deadline.stop()
+        return True
 
     def on_fetch_finished(self, found: bool, bibtex: str, error: object):
+        if not self._finish_worker():
+            return
         if found:
             self.textview.setPlainText(bibtex)
             self.status.setText("✅ Fetched successfully.")
@@ -156,6 +381,90 @@ class QuickBibWindow(QMainWindow):
 
         self._worker_thread = None
 
+    def on_search_finished(self, candidates: list, error: object):
+        if not self._finish_worker():
+            return
+        if not candidates:
+            # Let doi2bib3 have a go; it also understands some URLs as titles
+            worker = FetchWorker(self._worker_thread.query)
+            worker.finished.connect(self.on_fetch_finished)
+            self._start_lookup(worker)
+            worker.run()
+            return
+        self._worker_thread = None
+        self._show_candidates(candidates)
+        self.status.setText(f"✅ {len(candidates)} candidate(s), best match shown.")
+
+    def _show_candidates(self, candidates):
+        self._candidates = candidates
+        self.candidates.blockSignals(True)
+        self.candidates.clear()
+        for c in candidates:
+            authors = c.authors[0] + (" et al." if len(c.authors) > 1 else "") if c.authors else "Unknown"
+            self.candidates.addItem(f"{c.score:.0%}  {c.title} ({authors}, {c.year or 'n.d.'})")
+        self.candidates.blockSignals(False)
+        self.candidates.setVisible(bool(candidates))
+        if candidates:
+            self.candidates.setCurrentRow(0)
+
+    def on_candidate_selected(self, row: int):
+        if 0 <= row < len(self._candidates):
+            self.textview.setPlainText(self._candidates[row].bibtex)
+
+    def _dropped_paths(self, event):
+        mime = event.mimeData()
+        if not mime.hasUrls():
+            return []
+        paths = [u.toLocalFile() for u in mime.urls() if u.isLocalFile()]
+        return [p for p in paths if Path(p).is_dir() or p.lower().endswith(".pdf")]
+
+    def dragEnterEvent(self, event):
+        if self._scan_thread is None and self._dropped_paths(event):
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def dropEvent(self, event):
+        paths = self._dropped_paths(event)
+        if not paths or self._scan_thread is not None:
+            event.ignore()
+            return
+        event.acceptProposedAction()
+        self.scan_pdfs(paths)
+
+    def scan_pdfs(self, paths):
+        self.status.setText("Scanning PDFs...")
+        self.textview.clear()
+
+        worker = FolderScanWorker(paths)
+        worker.progress.connect(self.status.setText)
+        worker.finished.connect(self.on_scan_finished)
+
+        t = threading.Thread(target=worker.run, daemon=True)
+        t.start()
+
+        self._scan_thread = (worker, t)
+
+    def on_scan_finished(self, entries: list, missing: list):
+        self._scan_thread = None
+        if not entries:
+            self.status.setText(f"No BibTeX found ({len(missing)} PDF(s) skipped).")
+            return
+
+        self.textview.setPlainText(combine_bibtex(entries))
+        summary = f"✅ {len(entries)} entries"
+        if missing:
+            summary += f", {len(missing)} PDF(s) skipped"
+        self.status.setText(summary + ".")
+
+        path, _ = QFileDialog.getSaveFileName(self, "Save bibliography", "references.bib", "BibTeX files (*.bib)")
+        if path:
+            try:
+                write_bib(path, entries)
+                self.status.setText(f"{summary}, saved to {Path(path).name}.")
+            except OSError as e:
+                self.status.setText(f"Error: could not save {path}: {e}")
+
     def copy_to_clipboard(self):
         text = self.textview.toPlainText()
         if text.strip():
@@ -0,0 +1,88 @@
+"""Allocation tracking for hunting memory growth in a long-running window.
+
+Started with ``--debug-memory`` (or ``QUICKBIB_DEBUG_MEMORY=1``), which turns
+on tracemalloc. A report of the top allocation sites, with what changed
+since the previous report, is then written to stderr on demand: from
+*Help → Dump memory usage*, or by sending the process ``SIGUSR1``::
+
+    python3 -m quickbib --debug-memory &
+    kill -USR1 %1
+
+tracemalloc slows every allocation down, so none of this is active unless
+asked for.
+"""
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+# Stack depth recorded per allocation; enough to get past library frames
+TRACE_FRAMES = 10
+TOP_SITES = 25
+
+_previous = None
+_lock = threading.Lock()
+
+
+def requested(argv=()) -> bool:
+    return "--debug-memory" in argv or os.environ.get("QUICKBIB_DEBUG_MEMORY", "") not in ("", "0")
+
+
+def enabled() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def enable(frames: int = TRACE_FRAMES) -> None:
+    """Start tracking allocations and dump a report on SIGUSR1 where there is one."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+
+
+def live_qobjects() -> int:
+    """QObjects reachable from Python (0 if Qt is not loaded)."""
+    qtcore = sys.modules.get("PyQt6.QtCore")
+    if qtcore is None:
+        return 0
+    return sum(1 for o in gc.get_objects() if isinstance(o, qtcore.QObject))
+
+
+def report(limit: int = TOP_SITES) -> str:
+    """Top allocation sites, and the sites that grew most since the last report."""
+    global _previous
+    if not tracemalloc.is_tracing():
+        return "Memory debugging is off; start QuickBib with --debug-memory.\n"
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [
+        f"QuickBib memory report, {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"traced: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB), "
+        f"threads: {threading.active_count()}, Python-visible QObjects: {live_qobjects()}",
+        "",
+        f"Top {limit} allocation sites:",
+    ]
+    lines += [f"  {stat}" for stat in snapshot.statistics("lineno")[:limit]]
+    with _lock:
+        previous, _previous = _previous, snapshot
+    if previous is not None:
+        lines += ["", "Largest growth since the previous report:"]
+        for stat in snapshot.compare_to(previous, "traceback")[:10]:
+            if stat.size_diff <= 0:
+                break
+            lines.append(f"  {stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} blocks")
+            lines += [f"      {line}" for line in stat.traceback.format()]
+    return "\n".join(lines) + "\n"
+
+
+def dump(stream=None, limit: int = TOP_SITES) -> None:
+    stream = stream or sys.stderr
+    stream.write(report(limit))
+    stream.flush()
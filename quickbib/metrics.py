@@ -0,0 +1,165 @@
+"""In-process counters and latency histograms for the fetch path.
+
+Recording is meant to be free on the hot path: every thread writes to its
+own shard, so :meth:`Metrics.inc` and :meth:`Metrics.observe` never take a
+lock. Shards are merged only when a snapshot is taken, for the Diagnostics
+dialog or for export as JSON or Prometheus text. The shard of a thread that
+has ended is folded into a running total, so a session that starts many
+short-lived threads keeps only as many shards as there are live threads.
+"""
+import bisect
+import json
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PREFIX = "quickbib_"
+
+
+class _Shard:
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {}
+        # key -> [count per bucket (len(BUCKETS) + 1), sum]
+        self.histograms = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _merge(into: _Shard, shard: _Shard) -> None:
+    for key, value in shard.counters.copy().items():
+        into.counters[key] = into.counters.get(key, 0) + value
+    for key, hist in shard.histograms.copy().items():
+        merged = into.histograms.setdefault(key, [0] * len(hist[:-1]) + [0.0])
+        for i, v in enumerate(list(hist)):
+            merged[i] += v
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self._local = threading.local()
+        # (thread, shard) for every thread that has recorded something
+        self._shards = []
+        # What threads that have since ended recorded
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            # Only the first record from each thread takes the lock
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead(self) -> None:
+        """Fold the shards of ended threads into the total. Called with the lock held."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                # An ended thread records nothing more, so this is its final count
+                _merge(self._retired, shard)
+        self._shards = live
+
+    def inc(self, name: str, amount: int = 1, **labels) -> None:
+        counters = self._shard().counters
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        histograms = self._shard().histograms
+        key = _key(name, labels)
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shards = []
+            self._retired = _Shard()
+            self._local = threading.local()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Merge all shards into plain dictionaries."""
+        total = _Shard()
+        with self._lock:
+            self._retire_dead()
+            _merge(total, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _merge(total, shard)
+        return {"started": self.started, "counters": total.counters, "histograms": total.histograms}
+
+    def to_json(self) -> str:
+        snap = self.snapshot()
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(snap["counters"].items())
+        ]
+        histograms = []
+        for (name, labels), hist in sorted(snap["histograms"].items()):
+            histograms.append({
+                "name": name,
+                "labels": dict(labels),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], hist[:-1])),
+                "count": sum(hist[:-1]),
+                "sum": hist[-1],
+            })
+        return json.dumps({
+            "uptime_seconds": time.time() - snap["started"],
+            "counters": counters,
+            "histograms": histograms,
+        }, indent=2)
+
+    def to_prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = []
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        typed = set()
+        for (name, labels), value in sorted(snap["counters"].items()):
+            metric = f"{_PREFIX}{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{fmt(labels)} {value}")
+        for (name, labels), hist in sorted(snap["histograms"].items()):
+            metric = f"{_PREFIX}{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip([str(b) for b in BUCKETS] + ["+Inf"], hist[:-1]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{fmt(labels)} {hist[-1]}")
+            lines.append(f"{metric}_count{fmt(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path) -> None:
+        """Write a snapshot to ``path``: Prometheus text for .prom/.txt, else JSON."""
+        text = self.to_prometheus() if str(path).endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+# Process-wide instance used by the fetch path
+metrics = Metrics()
@@ -0,0 +1,177 @@
+"""Offline clean-up of BibTeX entries for journal submission.
+
+Applies the house style that doi2bib3 gives freshly fetched entries to any
+entry, without network access:
+
+* journal names abbreviated to ISO 4 from the bundled index
+  (:mod:`quickbib.abbreviations`),
+* capitalised words in titles protected with braces,
+* page ranges written with ``--``,
+* non-ASCII letters written as LaTeX commands (``M\\"{u}ller``),
+* entry types and field names in lower case.
+
+Entries are written in doi2bib3's layout; values that need no change keep
+exactly the form they were written in (macros, quotes, concatenations).
+"""
+import re
+import unicodedata
+
+from . import bibfile
+from .abbreviations import abbreviate
+
+# Values that must stay byte-for-byte as they are
+VERBATIM_FIELDS = frozenset({"url", "doi", "eprint", "file", "archiveprefix", "primaryclass", "isbn", "issn"})
+
+DIACRITICS = {
+    "\u0300": "\\`",
+    "\u0301": "\\'",
+    "\u0302": "\\^",
+    "\u0303": "\\~",
+    "\u0304": "\\=",
+    "\u0306": "\\u",
+    "\u0307": "\\.",
+    "\u0308": '\\"',
+    "\u030a": "\\r",
+    "\u030b": "\\H",
+    "\u030c": "\\v",
+    "\u0327": "\\c",
+    "\u0328": "\\k",
+    "\u0331": "\\b",
+}
+SPECIAL_CHARS = {
+    "\u00df": "{\\ss}",
+    "\u00c6": "{\\AE}",
+    "\u00e6": "{\\ae}",
+    "\u0152": "{\\OE}",
+    "\u0153": "{\\oe}",
+    "\u00d8": "{\\O}",
+    "\u00f8": "{\\o}",
+    "\u0141": "{\\L}",
+    "\u0142": "{\\l}",
+    "\u00d0": "{\\DH}",
+    "\u00f0": "{\\dh}",
+    "\u00de": "{\\TH}",
+    "\u00fe": "{\\th}",
+    "\u0110": "{\\DJ}",
+    "\u0111": "{\\dj}",
+    "\u0131": "{\\i}",
+    "\u0237": "{\\j}",
+    "\u00ae": "{\\textregistered}",
+    "\u00a0": "~",
+    "\u2013": "--",
+    "\u2014": "---",
+}
+
+_PAGE_DASH_RE = re.compile(r"(?<=\w)\s*(?:-{1,3}|[\u2010-\u2015\u2212])\s*(?=\w)")
+# A word, or a group, command or formula that is copied as it is
+_TITLE_TOKEN_RE = re.compile(r"\{|\\[A-Za-z]+|\\.|\$[^$]*\$|[^\W\d_]\w*")
+_HYPHENATED_RE = re.compile(r"(?:-\w+)+")
+
+
+class _LatexTable(dict):
+    """str.translate table that works out each character's LaTeX once."""
+
+    def __missing__(self, code):
+        char = chr(code)
+        decomposed = unicodedata.normalize("NFD", char)
+        base, marks = decomposed[0], decomposed[1:]
+        if marks and base.isascii() and base.isalpha() and all(m in DIACRITICS for m in marks):
+            latex = base
+            for mark in marks:
+                latex = f"{DIACRITICS[mark]}{{{latex}}}"
+        else:
+            latex = SPECIAL_CHARS.get(char, char)
+        self[code] = latex
+        return latex
+
+
+_latex_table = _LatexTable()
+
+
+def to_latex(value: str) -> str:
+    """Write non-ASCII letters as LaTeX commands; other characters are kept."""
+    if value.isascii():
+        return value
+    return unicodedata.normalize("NFC", value).translate(_latex_table)
+
+
+def protect_title(title: str) -> str:
+    """Wrap capitalised words in braces so bibliography styles keep their case."""
+    out = []
+    pos = 0
+    while True:
+        m = _TITLE_TOKEN_RE.search(title, pos)
+        if m is None:
+            break
+        out.append(title[pos:m.start()])
+        token, pos = m.group(), m.end()
+        if token == "{":
+            pos = bibfile.group_end(title, m.start())
+            pos = len(title) if pos < 0 else pos
+            token = title[m.start():pos]
+        elif token[0].isupper():
+            # "Bose-Einstein" is protected as one word
+            tail = _HYPHENATED_RE.match(title, pos)
+            if tail:
+                token, pos = token + tail.group(), tail.end()
+            token = "{" + token + "}"
+        out.append(token)
+    out.append(title[pos:])
+    return "".join(out)
+
+
+def normalize_pages(pages: str) -> str:
+    return _PAGE_DASH_RE.sub("--", pages.strip())
+
+
+def normalize_fields(fields: dict) -> dict:
+    """Return normalised copies of the values in ``fields`` (lower-case names)."""
+    out = {}
+    for name, value in fields.items():
+        if name not in VERBATIM_FIELDS:
+            if name == "journal":
+                value = abbreviate(value)
+            elif name == "pages":
+                value = normalize_pages(value)
+            if name == "title":
+                value = protect_title(value)
+            value = to_latex(value)
+        out[name] = value
+    return out
+
+
+def normalize_entry(chunk: str) -> str:
+    """Normalise one entry chunk from :func:`quickbib.bibfile.split`."""
+    entry = bibfile.parse_entry(chunk)
+    if entry is None or entry.type in bibfile.SPECIAL_TYPES or not entry.complete or not entry.fields:
+        return chunk
+    fields = normalize_fields(entry.fields)
+    entry.raw = {name: raw for name, raw in entry.raw.items() if fields[name] == entry.fields[name]}
+    entry.fields = fields
+    return bibfile.format_entry(entry)
+
+
+def normalize_bib(text: str):
+    """Normalise every entry in ``text``; returns ``(new_text, changed_entries)``."""
+    chunks = bibfile.split(text)
+    changed = 0
+    for i, chunk in enumerate(chunks):
+        if chunk.startswith("@"):
+            new = normalize_entry(chunk)
+            if new != chunk:
+                chunks[i] = new
+                changed += 1
+    return "".join(chunks), changed
+
+
+def normalize_file(path, output=None) -> int:
+    """Normalise a .bib file in place (or into ``output``); returns the changed entry count."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    new_text, changed = normalize_bib(text)
+    if output is not None:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            f.write(new_text)
+    elif changed:
+        bibfile.write_atomic(path, new_text)
+    return changed
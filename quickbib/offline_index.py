@@ -0,0 +1,304 @@
+"""Offline resolution from a local CrossRef metadata dump.
+
+CrossRef's public data files are directories of gzip-compressed JSON shards.
+``quickbib import-crossref`` converts each shard into BibTeX in a process
+pool and stores the result in an SQLite database keyed by DOI, with an
+index of normalised titles next to it. :func:`lookup` then answers DOI (and
+exact title) queries from disk with a B-tree search and no network access.
+
+Ingest holds at most a couple of shards per worker in memory, and shards
+already imported are recorded so an interrupted import can be resumed.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from .app_info import DATA_DIR
+from .identifiers import parse_doi
+
+DEFAULT_INDEX_PATH = DATA_DIR / "crossref.sqlite3"
+SHARD_SUFFIXES = (".json.gz", ".jsonl.gz", ".json", ".jsonl")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (doi TEXT PRIMARY KEY, bibtex TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS titles (title TEXT NOT NULL, doi TEXT NOT NULL);
+-- Shards are told apart by full path and by size and mtime, so two dumps
+-- with identically named shards (part-0001.jsonl.gz) are both imported.
+CREATE TABLE IF NOT EXISTS imported_shards (
+    path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (path, size, mtime_ns)
+) WITHOUT ROWID;
+"""
+
+# Run once each, in order, on top of _SCHEMA; PRAGMA user_version counts
+# those an index has had
+_MIGRATIONS = (
+    # Shards used to be keyed by file name alone
+    "DROP TABLE IF EXISTS shards;",
+    # Re-importing a changed shard used to add its titles again
+    """
+    DELETE FROM titles WHERE rowid NOT IN (SELECT MIN(rowid) FROM titles GROUP BY title, doi);
+    DROP INDEX IF EXISTS titles_title;
+    CREATE UNIQUE INDEX IF NOT EXISTS titles_title_doi ON titles (title, doi);
+    """,
+)
+
+_ENTRY_TYPES = {
+    "journal-article": "article",
+    "proceedings-article": "inproceedings",
+    "book": "book",
+    "monograph": "book",
+    "edited-book": "book",
+    "book-chapter": "incollection",
+    "dissertation": "phdthesis",
+    "report": "techreport",
+}
+_CONTAINER_FIELD = {"article": "journal", "inproceedings": "booktitle", "incollection": "booktitle"}
+_TAG_RE = re.compile(r"<[^>]+>")
+# Identifiers that doi2bib3 resolves itself and must not be taken for titles
+_NOT_A_TITLE_RE = re.compile(r"^(?:https?://|arxiv:|\d{4}\.\d{4,5}(?:v\d+)?$|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})", re.I)
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def index_path() -> Path:
+    """Location of the offline index; ``QUICKBIB_OFFLINE_INDEX`` overrides it."""
+    override = os.environ.get("QUICKBIB_OFFLINE_INDEX")
+    return Path(override) if override else DEFAULT_INDEX_PATH
+
+
+def normalize_title(title: str) -> str:
+    """Reduce a title to lowercase words so trivial differences still match."""
+    title = unicodedata.normalize("NFKD", _TAG_RE.sub("", title))
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    return " ".join(_NON_WORD_RE.sub(" ", title.lower()).split())
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else ""
+    return value or ""
+
+
+def _year(item):
+    for field in ("issued", "published-print", "published-online", "created"):
+        parts = (item.get(field) or {}).get("date-parts") or []
+        if parts and parts[0] and parts[0][0]:
+            return str(parts[0][0])
+    return ""
+
+
+def _clean(value) -> str:
+    # Unbalanced braces would corrupt the entry; CrossRef values rarely need them
+    return " ".join(str(value).replace("{", "").replace("}", "").split())
+
+
+def crossref_to_bibtex(item: dict):
+    """Convert one CrossRef work record to a BibTeX entry, or None without a DOI."""
+    doi = item.get("DOI")
+    if not doi:
+        return None
+    entry_type = _ENTRY_TYPES.get(item.get("type"), "misc")
+
+    authors = []
+    for a in item.get("author") or []:
+        if a.get("family"):
+            authors.append(f"{a['family']}, {a['given']}" if a.get("given") else a["family"])
+        elif a.get("name"):
+            authors.append(a["name"])
+
+    title = _first(item.get("title"))
+    year = _year(item)
+    pages = item.get("page") or item.get("article-number") or ""
+
+    fields = [("author", " and ".join(authors)), ("title", title)]
+    if entry_type in _CONTAINER_FIELD:
+        fields.append((_CONTAINER_FIELD[entry_type], _first(item.get("container-title"))))
+    if entry_type == "phdthesis":
+        institutions = item.get("institution") or []
+        if isinstance(institutions, dict):
+            institutions = [institutions]
+        fields.append(("school", institutions[0].get("name", "") if institutions else ""))
+    fields += [
+        ("volume", item.get("volume", "")),
+        ("number", item.get("issue", "")),
+        ("pages", pages if "--" in pages else pages.replace("-", "--")),
+        ("year", year),
+        ("publisher", item.get("publisher", "")),
+        ("doi", doi),
+    ]
+
+    lastname = authors[0].split(",")[0] if authors else ""
+    lastname = "".join(c for c in unicodedata.normalize("NFKD", lastname) if not unicodedata.combining(c))
+    firstword = title.split()[0] if title.split() else ""
+    key = "_".join(p for p in (re.sub(r"[^A-Za-z0-9\-]+", "", lastname),
+                               re.sub(r"[^a-z0-9\-]+", "", firstword.lower()),
+                               year) if p) or "entry"
+
+    body = ",\n".join(f" {name} = {{{_clean(value)}}}" for name, value in fields if value)
+    return f"@{entry_type}{{{key},\n{body}\n}}\n", normalize_title(title)
+
+
+def _read_items(path: Path):
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        if path.name.endswith((".jsonl", ".jsonl.gz")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("items") or (data.get("message") or {}).get("items") or []
+    yield from data
+
+
+def _convert_shard(path: str):
+    """Worker: return ``(shard, rows, error)``, one ``(doi, bibtex, title)`` row per work."""
+    rows = []
+    try:
+        for item in _read_items(Path(path)):
+            converted = crossref_to_bibtex(item)
+            if converted:
+                bibtex, title = converted
+                rows.append((item["DOI"].lower(), bibtex, title))
+    except (OSError, ValueError, EOFError) as e:
+        return path, None, str(e)
+    return path, rows, None
+
+
+def find_shards(paths) -> list:
+    shards = set()
+    for p in map(Path, paths):
+        if p.is_dir():
+            shards.update(s for s in p.rglob("*") if s.name.endswith(SHARD_SUFFIXES))
+        elif p.name.endswith(SHARD_SUFFIXES):
+            shards.add(p)
+    return sorted(str(s.resolve()) for s in shards)
+
+
+def _signature(shard: str) -> tuple:
+    """What identifies an imported shard: its resolved path, size and mtime."""
+    st = os.stat(shard)
+    return shard, st.st_size, st.st_mtime_ns
+
+
+def _migrate(db) -> None:
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(_MIGRATIONS[version:], version + 1):
+        db.executescript(script)
+        db.execute(f"PRAGMA user_version = {number}")
+    db.commit()
+
+
+def ingest(paths, index=None, max_workers=None, titles=True, progress=None) -> int:
+    """Import CrossRef dump shards under ``paths`` into the offline index.
+
+    Returns the number of works added. Shards imported by an earlier run are
+    skipped.
+    """
+    index = Path(index) if index else index_path()
+    index.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(index)
+    db.executescript(_SCHEMA)
+    _migrate(db)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+
+    done = set(db.execute("SELECT path, size, mtime_ns FROM imported_shards"))
+    todo = [s for s in find_shards(paths) if _signature(s) not in done]
+    if progress:
+        progress(f"Importing {len(todo)} shard(s), {len(done)} already imported...")
+
+    added = 0
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        queue = iter(todo)
+        while True:
+            # Only keep a couple of shards per worker in flight so memory stays
+            # bounded no matter how large the dump is.
+            for shard in queue:
+                pending.add(pool.submit(_convert_shard, shard))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                shard, rows, error = fut.result()
+                if rows is None:
+                    if progress:
+                        progress(f"skipped {shard}: {error}")
+                    continue
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO works VALUES (?, ?)",
+                                   ((doi, bibtex) for doi, bibtex, _ in rows))
+                    if titles:
+                        db.executemany("INSERT OR IGNORE INTO titles VALUES (?, ?)",
+                                       ((title, doi) for doi, _, title in rows if title))
+                    db.execute("INSERT OR IGNORE INTO imported_shards VALUES (?, ?, ?)", _signature(shard))
+                added += len(rows)
+                if progress:
+                    progress(f"{os.path.basename(shard)}: {len(rows)} works")
+    db.close()
+    return added
+
+
+_local = threading.local()
+
+
+def _connection():
+    """Per-thread read-only connection, or None if there is no index."""
+    path = index_path()
+    db = getattr(_local, "db", None)
+    if db is not None and _local.path == path:
+        return db
+    if not path.exists():
+        return None
+    db = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    _local.db, _local.path = db, path
+    return db
+
+
+def _finish(bibtex: str) -> str:
+    # doi2bib3's normaliser looks up a missing page range online, so only use
+    # it when the entry already has one.
+    if " pages = {" not in bibtex:
+        return bibtex
+    try:
+        from doi2bib3.normalize import normalize_bibtex
+        return normalize_bibtex(bibtex)
+    except Exception:
+        return bibtex
+
+
+def lookup(identifier: str):
+    """Return BibTeX for ``identifier`` from the offline index, or None.
+
+    DOIs are looked up directly. Anything that is not a DOI, arXiv ID or URL
+    is treated as a title and must match an indexed title exactly after
+    normalisation.
+    """
+    try:
+        db = _connection()
+        if db is None:
+            return None
+        doi = parse_doi(identifier)
+        if doi:
+            row = db.execute("SELECT bibtex FROM works WHERE doi = ?", (doi.lower(),)).fetchone()
+        elif _NOT_A_TITLE_RE.match(identifier.strip()):
+            return None
+        else:
+            row = db.execute(
+                "SELECT w.bibtex FROM titles t JOIN works w ON w.doi = t.doi WHERE t.title = ? LIMIT 1",
+                (normalize_title(identifier),),
+            ).fetchone()
+        return _finish(row[0]) if row else None
+    except sqlite3.Error:
+        return None
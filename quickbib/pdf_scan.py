@@ -0,0 +1,238 @@
+"""Find DOIs and arXiv IDs inside downloaded PDFs.
+
+Each PDF is memory-mapped and only two places are searched: the XMP
+metadata packet, where publishers record the article DOI, and the text of
+the first few content streams, which is where the arXiv stamp and the
+"DOI: ..." line of a journal article end up. The rest of the file (in
+particular the reference list) is never looked at, otherwise the DOIs of
+cited papers would be picked up as well.
+
+Scans run in a process pool and their results are cached by path, size and
+modification time, so scanning an unchanged folder again is free.
+"""
+import json
+import mmap
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from .app_info import CACHE_DIR
+from .identifiers import find_identifiers
+from .batch import fetch_many
+
+PDF_SCAN_CACHE = CACHE_DIR / "pdf_scan.json"
+CACHE_VERSION = 1
+
+# How much of the document counts as "the first pages"
+MAX_CONTENT_STREAMS = 12
+# Upper bound on the inflated size of a single stream we look at
+MAX_INFLATED = 2 * 1024 * 1024
+
+_XMP_START = b"<x:xmpmeta"
+_XMP_END = b"</x:xmpmeta>"
+_STREAM_RE = re.compile(rb"\bstream\r?\n")
+# Streams that never hold page text: images, embedded fonts, object streams
+_SKIP_DICT_RE = re.compile(rb"/Subtype\s*/Image|/Length1|/Length2|/ObjStm|/XRef|/Type\s*/Metadata")
+# Text showing operators: [(..) -20 (..)] TJ  and  (..) Tj
+_TEXT_SHOW_RE = re.compile(rb"\[((?:[^\]\\]|\\.)*)\]\s*TJ|\(((?:[^)\\]|\\.)*)\)\s*Tj", re.S)
+_LITERAL_RE = re.compile(rb"\(((?:[^)\\]|\\.)*)\)", re.S)
+_ESCAPE_RE = re.compile(rb"\\([()\\])")
+
+
+def _unescape(literal: bytes) -> bytes:
+    return _ESCAPE_RE.sub(rb"\1", literal)
+
+
+def _stream_text(data: bytes) -> bytes:
+    """Approximate the text drawn by a content stream.
+
+    Kerned fragments of one ``TJ`` array are joined so identifiers split by
+    the typesetter come out whole.
+    """
+    lines = []
+    for m in _TEXT_SHOW_RE.finditer(data):
+        if m.group(1) is not None:
+            lines.append(b"".join(_unescape(s) for s in _LITERAL_RE.findall(m.group(1))))
+        else:
+            lines.append(_unescape(m.group(2)))
+    return b"\n".join(lines)
+
+
+def _scan_xmp(mm) -> list:
+    start = mm.find(_XMP_START)
+    if start < 0:
+        return []
+    end = mm.find(_XMP_END, start)
+    if end < 0:
+        return []
+    return find_identifiers(mm[start:end])
+
+
+def _scan_first_pages(mm) -> list:
+    scanned = 0
+    for m in _STREAM_RE.finditer(mm):
+        if scanned >= MAX_CONTENT_STREAMS:
+            break
+        # The stream dictionary sits between "obj" and the "stream" keyword
+        obj = mm.rfind(b"obj", max(0, m.start() - 4096), m.start())
+        header = mm[obj if obj >= 0 else max(0, m.start() - 512):m.start()]
+        if _SKIP_DICT_RE.search(header) or b"/FlateDecode" not in header:
+            continue
+        try:
+            data = zlib.decompressobj().decompress(mm[m.end():m.end() + MAX_INFLATED], MAX_INFLATED)
+        except zlib.error:
+            continue
+        if b"BT" not in data:
+            continue
+        scanned += 1
+        ids = find_identifiers(_stream_text(data))
+        if ids:
+            return ids
+    return []
+
+
+def scan_pdf(path) -> list:
+    """Return identifiers found in one PDF, most trustworthy first.
+
+    Unreadable or malformed files yield an empty list.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ids = _scan_xmp(mm)
+                for ident in _scan_first_pages(mm):
+                    if ident not in ids:
+                        ids.append(ident)
+                return ids
+    except (OSError, ValueError):
+        return []
+
+
+class ScanCache:
+    """Per-file scan results keyed by path, size and mtime."""
+
+    def __init__(self, path=PDF_SCAN_CACHE):
+        self.path = path
+        self._files = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, path: str, st):
+        entry = self._files.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path: str, st, ids) -> None:
+        self._files[path] = [st.st_size, st.st_mtime_ns, list(ids)]
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self._files}, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            # The cache is only an optimisation
+            pass
+
+
+def collect_pdfs(paths) -> list:
+    """Expand files and directory trees in ``paths`` into a sorted list of PDFs."""
+    found = set()
+    for p in paths:
+        p = os.path.abspath(p)
+        if os.path.isdir(p):
+            for root, _dirs, files in os.walk(p):
+                for name in files:
+                    if name.lower().endswith(".pdf"):
+                        found.add(os.path.join(root, name))
+        elif p.lower().endswith(".pdf") and os.path.isfile(p):
+            found.add(p)
+    return sorted(found)
+
+
+def scan_pdfs(pdfs, max_workers=None, cache=None, progress=None) -> dict:
+    """Scan ``pdfs`` and return ``{path: [identifiers]}``.
+
+    Files already in ``cache`` with unchanged size and mtime are not opened;
+    the rest are spread over a process pool.
+    """
+    if cache is None:
+        cache = ScanCache()
+    results = {}
+    todo = []
+    for path in pdfs:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        cached = cache.get(path, st)
+        if cached is not None:
+            results[path] = cached
+        else:
+            todo.append((path, st))
+
+    if progress:
+        progress(f"Scanning {len(todo)} PDF(s), {len(results)} unchanged...")
+    if todo:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            chunksize = max(1, len(todo) // ((max_workers or os.cpu_count() or 1) * 4))
+            scanned = pool.map(scan_pdf, [p for p, _ in todo], chunksize=chunksize)
+            for (path, st), ids in zip(todo, scanned):
+                results[path] = ids
+                cache.put(path, st, ids)
+        cache.save()
+    return results
+
+
+def build_bibliography(paths, max_workers=None, progress=None):
+    """Scan PDFs under ``paths`` and fetch BibTeX for every identifier found.
+
+    Returns ``(entries, missing)``: the BibTeX strings in file order, and
+    ``(path, reason)`` pairs for PDFs that produced no entry.
+    """
+    pdfs = collect_pdfs(paths)
+    if not pdfs:
+        return [], []
+    scanned = scan_pdfs(pdfs, max_workers=max_workers, progress=progress)
+
+    missing = []
+    wanted = {}
+    for path in pdfs:
+        ids = scanned.get(path)
+        if ids:
+            wanted[path] = ids[0]
+        else:
+            missing.append((path, "no DOI or arXiv ID found"))
+
+    if progress:
+        progress(f"Fetching BibTeX for {len(set(wanted.values()))} identifier(s)...")
+    fetched = {}
+    for ident, found, bibtex, error in fetch_many(wanted.values()):
+        fetched[ident] = (found, bibtex, error)
+
+    entries = []
+    seen = set()
+    for path, ident in wanted.items():
+        found, bibtex, error = fetched[ident]
+        if not found:
+            missing.append((path, f"{ident}: {error or 'not found'}"))
+        elif ident not in seen:
+            seen.add(ident)
+            entries.append(bibtex)
+    return entries, missing
@@ -4,13 +4,23 @@ import sys
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import QTimer
 
 from .app_info import APP_NAME, APP_VERSION, HOMEPAGE, REPO_URL, LICENSE_PATH
 from .main_window import QuickBibWindow
+from . import connections, memory_debug
 
 
 def main(argv):
+    if memory_debug.requested(argv):
+        memory_debug.enable()
     app = QApplication(argv)
+    if memory_debug.enabled():
+        # Python signal handlers only run when Python code does; wake it up
+        # now and then so SIGUSR1 is noticed while Qt's loop is idle.
+        signal_timer = QTimer()
+        signal_timer.timeout.connect(lambda: None)
+        signal_timer.start(500)
     # Only set desktop/WM hints on Linux. Windows and macOS do not use
     # desktop files and may behave differently; restrict the change to
     # avoid affecting those platforms.
@@ -47,6 +57,8 @@ def main(argv):
         pass
     win = QuickBibWindow()
     win.show()
+    # Set up connections to the resolvers while the user is still typing
+    connections.start_warm_up(argv)
     return app.exec()
 
 
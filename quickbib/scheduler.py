@@ -0,0 +1,140 @@
+"""Shared, prioritised queue for all lookups that run in the background.
+
+A lookup typed into the window must not wait behind hundreds of lookups
+from a folder scan. Every job therefore carries a priority class:
+
+* ``INTERACTIVE`` - the user is waiting for it,
+* ``SPECULATIVE`` - likely to be wanted soon (prefetching),
+* ``BULK`` - batch work such as folder and manuscript scans.
+
+Jobs are taken lowest class first, FIFO within a class. Background classes
+may occupy at most ``workers`` threads; ``reserved`` extra threads only ever
+run interactive jobs, so a user lookup starts immediately even while a batch
+keeps its full concurrency.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from .helpers import get_bibtex_for_doi
+from .metrics import metrics
+
+INTERACTIVE = 0
+SPECULATIVE = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SPECULATIVE: "speculative", BULK: "bulk"}
+
+DEFAULT_WORKERS = 8
+DEFAULT_RESERVED = 2
+
+
+class FetchScheduler:
+    def __init__(self, workers: int = DEFAULT_WORKERS, reserved: int = DEFAULT_RESERVED,
+                 fetch=get_bibtex_for_doi):
+        self.workers = max(1, workers)
+        self.reserved = max(1, reserved)
+        # Called as fetch(identifier, interactive=...)
+        self._fetch = fetch
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._background_running = 0
+        self._waits = {p: [0, 0.0, 0.0] for p in PRIORITY_NAMES}  # count, total, max
+        self._shutdown = False
+
+    def submit(self, identifier: str, priority: int = BULK, fetch=None) -> Future:
+        """Queue a lookup; the future resolves to ``(found, bibtex, error)``.
+
+        ``fetch`` replaces the scheduler's lookup function for this job (it
+        is called the same way); the future then resolves to its result.
+        """
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("scheduler has been shut down")
+            heapq.heappush(self._queue, (priority, next(self._seq), time.monotonic(), identifier,
+                                         fetch or self._fetch, future))
+            # Idle threads only leave the idle count once they wake, so a
+            # burst must be compared with the whole queue, not with zero
+            if len(self._queue) > self._idle and len(self._threads) < self.workers + self.reserved:
+                self._start_thread()
+            self._cond.notify_all()
+        return future
+
+    def _start_thread(self):
+        t = threading.Thread(target=self._run, name=f"quickbib-fetch-{len(self._threads)}", daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def _next_job(self):
+        """Pop the next runnable job, waiting if needed. Called with the lock held."""
+        while True:
+            if self._shutdown and not self._queue:
+                return None
+            if self._queue:
+                priority = self._queue[0][0]
+                if priority == INTERACTIVE or self._background_running < self.workers:
+                    return heapq.heappop(self._queue)
+            self._idle += 1
+            self._cond.wait()
+            self._idle -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                priority, _, queued_at, identifier, fetch, future = job
+                if priority != INTERACTIVE:
+                    self._background_running += 1
+                waited = time.monotonic() - queued_at
+                stats = self._waits[priority]
+                stats[0] += 1
+                stats[1] += waited
+                stats[2] = max(stats[2], waited)
+            metrics.observe("queue_wait_seconds", waited, priority=PRIORITY_NAMES[priority])
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fetch(identifier, interactive=priority == INTERACTIVE))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            if priority != INTERACTIVE:
+                with self._cond:
+                    self._background_running -= 1
+                    self._cond.notify_all()
+
+    def wait_stats(self) -> dict:
+        """Queue wait per priority class: ``{name: {count, mean, max}}`` in seconds."""
+        with self._cond:
+            return {
+                PRIORITY_NAMES[p]: {
+                    "count": count,
+                    "mean": total / count if count else 0.0,
+                    "max": longest,
+                }
+                for p, (count, total, longest) in self._waits.items()
+            }
+
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def shutdown(self, cancel_pending: bool = False) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                for job in self._queue:
+                    job[-1].cancel()
+                self._queue.clear()
+            self._cond.notify_all()
+
+
+# The process-wide scheduler used by the window and the batch tools
+scheduler = FetchScheduler()
@@ -0,0 +1,214 @@
+"""Title search that offers several candidates instead of one guess.
+
+doi2bib3 answers a title query with the first hit of a fuzzy CrossRef
+search. :func:`search` asks CrossRef for the top :data:`SEARCH_ROWS` works in
+a single request, fetches the BibTeX of all of them concurrently and ranks
+them locally against the query by title, author and year similarity. The
+window shows the ranked list, so picking another candidate costs no further
+network access.
+
+Searches go through the shared scheduler like every other lookup, and are
+counted in the metrics under ``source="title"``. A title already in the
+lookup cache or the offline index is answered from there, and the
+candidates of recent searches are remembered, so searching again costs no
+network access either.
+"""
+import difflib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from typing import Optional
+from urllib.parse import quote
+
+from . import bibfile, cache, connections, deadlines, offline_index
+from .helpers import get_bibtex_for_doi, rate_limiter
+from .metrics import metrics
+from .offline_index import normalize_title
+from .scheduler import INTERACTIVE, SPECULATIVE, scheduler
+
+SEARCH_ROWS = 5
+# Searches whose candidates are remembered for the session
+SEARCH_MEMORY = 64
+SEARCH_URL = "https://api.crossref.org/works?query.bibliographic={query}&rows={rows}&select=DOI,title,author,issued"
+USER_AGENT = "QuickBib (https://github.com/archisman-panigrahi/QuickBib)"
+# Share of the score for title, author and year agreement
+TITLE_WEIGHT = 0.75
+AUTHOR_WEIGHT = 0.15
+YEAR_WEIGHT = 0.10
+
+_YEAR_RE = re.compile(r"\b(1[89]\d\d|20\d\d)\b")
+
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+@dataclass
+class Candidate:
+    doi: str
+    title: str
+    authors: list
+    year: Optional[str]
+    score: float = 0.0
+    bibtex: str = ""
+    error: Optional[str] = None
+
+
+def _candidate(item) -> Candidate:
+    title = (item.get("title") or [""])[0]
+    authors = [a.get("family") or a.get("name") or "" for a in item.get("author") or []]
+    parts = (item.get("issued") or {}).get("date-parts") or [[None]]
+    year = str(parts[0][0]) if parts[0] and parts[0][0] else None
+    return Candidate(item["DOI"], title, [a for a in authors if a], year)
+
+
+def score(query: str, candidate: Candidate) -> float:
+    """Similarity of ``candidate`` to ``query`` between 0 and 1."""
+    words = normalize_title(query).split()
+    years = set(_YEAR_RE.findall(query))
+    surnames = {w for a in candidate.authors[:3] for w in normalize_title(a).split()}
+    # Author names and years in the query are not part of the title
+    title_words = [w for w in words if w not in surnames and w not in years]
+    title = normalize_title(candidate.title)
+    title_score = difflib.SequenceMatcher(None, " ".join(title_words), title, autojunk=False).ratio()
+    title_set = set(title.split())
+    if title_set:
+        # Word overlap copes with queries that are only part of the title
+        title_score = max(title_score, len(title_set.intersection(title_words)) / len(title_set) * 0.9)
+
+    author_score = 1.0 if surnames.intersection(words) else 0.0
+    year_score = 1.0 if candidate.year in years else 0.0
+    if not years:
+        # Nothing to compare: neither reward nor penalise
+        year_score = 0.5
+    return TITLE_WEIGHT * title_score + AUTHOR_WEIGHT * author_score + YEAR_WEIGHT * year_score
+
+
+def find_candidates(query: str, rows: int = SEARCH_ROWS) -> list:
+    """Return CrossRef's top ``rows`` works for ``query``, best match first."""
+    rate_limiter.acquire(wait=False)
+    start = time.perf_counter()
+    try:
+        with deadlines.deadline():
+            resp = deadlines.timed_get(
+                connections.session.get,
+                SEARCH_URL.format(query=quote(query.strip()), rows=rows),
+                headers={"User-Agent": USER_AGENT},
+            )
+        resp.raise_for_status()
+        items = resp.json().get("message", {}).get("items", [])
+    except Exception as e:
+        metrics.inc("errors", source="title", error=type(e).__name__)
+        raise
+    finally:
+        metrics.observe("lookup_seconds", time.perf_counter() - start, source="title")
+    candidates = [_candidate(item) for item in items if item.get("DOI")]
+    for c in candidates:
+        c.score = score(query, c)
+    candidates.sort(key=lambda c: c.score, reverse=True)
+    return candidates
+
+
+def _fetch_bibtex(candidates, result: Future) -> None:
+    """Fetch the BibTeX of ``candidates`` through the scheduler, then resolve ``result``."""
+    if not candidates:
+        result.set_result([])
+        return
+    pending = [len(candidates)]
+    lock = threading.Lock()
+
+    def done(c, future):
+        try:
+            found, c.bibtex, c.error = future.result()
+        except Exception as e:
+            found, c.error = False, str(e)
+        if not found:
+            c.bibtex = ""
+        with lock:
+            pending[0] -= 1
+            last = pending[0] == 0
+        if last:
+            result.set_result([c for c in candidates if c.bibtex])
+
+    for i, c in enumerate(candidates):
+        future = scheduler.submit(c.doi, INTERACTIVE if i == 0 else SPECULATIVE)
+        future.add_done_callback(lambda f, c=c: done(c, f))
+
+
+def _local_candidate(query: str, bibtex: str) -> Candidate:
+    entry = bibfile.parse_entry(bibtex.strip())
+    fields = entry.fields if entry is not None else {}
+    authors = [(a.split(",")[0].split() or [a.strip()])[-1]
+               for a in re.split(r"\s+and\s+", fields.get("author", "")) if a.strip()]
+    year = _YEAR_RE.search(fields.get("year", ""))
+    return Candidate(fields.get("doi", ""), fields.get("title", query).strip("{}"), authors,
+                     year.group() if year else None, 1.0, bibtex)
+
+
+def _search_job(query: str, rows: int, interactive: bool):
+    """Scheduler job: ``(True, [local candidate])`` or ``(False, candidates to fetch)``.
+
+    Counted under ``source="title"`` like every other lookup.
+    """
+    cached = cache.get(query)
+    if (cached is not None and cached[0]) or offline_index.lookup(query) is not None:
+        # get_bibtex_for_doi answers from there (recording the hit), with
+        # normalisation and keys applied
+        found, bibtex, _ = get_bibtex_for_doi(query, interactive)
+        return True, [_local_candidate(query, bibtex)] if found else []
+    metrics.inc("lookups", source="title")
+    metrics.inc("cache_misses", source="title")
+    return False, find_candidates(query, rows)
+
+
+def search_async(query: str, rows: int = SEARCH_ROWS) -> Future:
+    """Like :func:`search`, but returns a future and blocks no thread while waiting.
+
+    The whole search runs on the scheduler at interactive priority, so the
+    calling (GUI) thread never touches the cache or the network. A query
+    answered by the lookup cache or the offline index needs no CrossRef
+    search at all. Otherwise the candidates are remembered for the session,
+    so repeating a search only takes BibTeX from the cache.
+    """
+    result = Future()
+    key = (normalize_title(query), rows)
+    with _recent_lock:
+        recent = _recent.get(key)
+        if recent is not None:
+            _recent.move_to_end(key)
+    if recent is not None:
+        metrics.inc("lookups", source="title")
+        metrics.inc("cache_hits", source="title")
+        _fetch_bibtex([replace(c) for c in recent], result)
+        return result
+
+    def found(future):
+        try:
+            local, candidates = future.result()
+        except Exception as e:
+            result.set_exception(e)
+            return
+        if local:
+            result.set_result(candidates)
+            return
+        with _recent_lock:
+            _recent[key] = [replace(c) for c in candidates]
+            while len(_recent) > SEARCH_MEMORY:
+                _recent.popitem(last=False)
+        _fetch_bibtex(candidates, result)
+
+    search_job = scheduler.submit(query, INTERACTIVE,
+                                  fetch=lambda q, interactive: _search_job(q, rows, interactive))
+    search_job.add_done_callback(found)
+    return result
+
+
+def search(query: str, rows: int = SEARCH_ROWS) -> list:
+    """Return ranked :class:`Candidate` objects with their BibTeX fetched.
+
+    Candidates whose BibTeX could not be fetched are dropped. The best
+    ranked one is fetched at interactive priority, the others speculatively.
+    """
+    return search_async(query, rows).result()
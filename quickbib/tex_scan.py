@@ -0,0 +1,135 @@
+"""Collect the DOIs and arXiv IDs referenced by a LaTeX project.
+
+Sources are read line by line, following ``\\input`` and ``\\include``, so
+even a multi-megabyte thesis is never held in memory at once. DOIs and
+prefixed arXiv IDs (``arXiv:...`` or arxiv.org URLs) are picked up anywhere,
+comments included. Bare arXiv numbers such as ``2411.08091`` are only
+trusted inside a ``\\bibitem`` block.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from . import keys
+from .identifiers import find_identifiers, clean_arxiv_id
+from .batch import DEFAULT_WORKERS, fetch_many, bibtex_key
+from .cache import cache_key
+
+_INPUT_RE = re.compile(r"\\(?:input|include|subfile)\s*\{([^}]+)\}")
+_BIBITEM_RE = re.compile(r"\\bibitem\s*(?:\[[^\]]*\])?\s*\{([^}]+)\}")
+_END_BIBLIOGRAPHY_RE = re.compile(r"\\end\s*\{thebibliography\}")
+_BARE_ARXIV_RE = re.compile(r"(?<![\w./])(\d{4}\.\d{4,5}(?:v\d+)?)(?![\w/])")
+# A % that is not escaped starts a comment
+_COMMENT_RE = re.compile(r"(?<!\\)%")
+
+
+@dataclass
+class Reference:
+    identifier: str
+    path: str
+    line: int
+    bibitem: Optional[str] = None
+
+
+def _resolve_input(name: str, base_dir: str) -> str:
+    path = os.path.join(base_dir, name.strip())
+    if not os.path.splitext(path)[1]:
+        path += ".tex"
+    return os.path.normpath(path)
+
+
+def scan_tex(main_file):
+    """Yield a :class:`Reference` for each identifier in ``main_file`` and its inputs.
+
+    Each identifier is reported once, at its first occurrence (DOIs
+    compared case-insensitively). As in LaTeX,
+    input paths are relative to the directory of the main file.
+    """
+    base_dir = os.path.dirname(os.path.abspath(main_file))
+    seen_files = set()
+    seen_ids = set()
+
+    def walk(path):
+        if path in seen_files:
+            return
+        seen_files.add(path)
+        bibitem = None
+        try:
+            f = open(path, "r", encoding="utf-8", errors="replace")
+        except OSError:
+            return
+        with f:
+            for lineno, line in enumerate(f, 1):
+                m = _COMMENT_RE.search(line)
+                code = line[:m.start()] if m else line
+
+                m = _BIBITEM_RE.search(code)
+                if m:
+                    bibitem = m.group(1).strip()
+                elif bibitem and _END_BIBLIOGRAPHY_RE.search(code):
+                    bibitem = None
+
+                ids = find_identifiers(line)
+                if bibitem:
+                    ids += [clean_arxiv_id(a) for a in _BARE_ARXIV_RE.findall(code)]
+                for ident in ids:
+                    # DOIs are case-insensitive: 10.1000/abc and 10.1000/ABC are one work
+                    key = cache_key(ident)
+                    if key not in seen_ids:
+                        seen_ids.add(key)
+                        yield Reference(ident, path, lineno, bibitem)
+
+                for name in _INPUT_RE.findall(code):
+                    yield from walk(_resolve_input(name, base_dir))
+
+    yield from walk(os.path.abspath(main_file))
+
+
+def resolve_references(references, max_workers=None):
+    """Fetch BibTeX for ``references`` concurrently.
+
+    Returns ``(entries, rows)``: the BibTeX strings in order of first
+    appearance, and one ``(reference, key, error)`` row per reference for the
+    key-mapping report. With a key format set, the entries already carry
+    their final keys.
+    """
+    references = list(references)
+    ids = [r.identifier for r in references]
+    fetched = {ident: (found, bibtex, error)
+               for ident, found, bibtex, error in fetch_many(ids, max_workers or DEFAULT_WORKERS)}
+
+    entries = []
+    failed = {}
+    for ref in references:
+        found, bibtex, error = fetched[ref.identifier]
+        if found:
+            entries.append(bibtex)
+        else:
+            failed[ref.identifier] = error or "not found"
+    if keys.key_format:
+        # Keys are assigned here, once, so the report and the .bib agree;
+        # write the entries with write_bib(..., rekey=False).
+        entries = keys.assign_keys(entries, keys.key_format)
+
+    found_keys = iter(bibtex_key(e) for e in entries)
+    rows = []
+    for ref in references:
+        if ref.identifier in failed:
+            rows.append((ref, None, failed[ref.identifier]))
+        else:
+            rows.append((ref, next(found_keys), None))
+    return entries, rows
+
+
+def write_report(rows, out) -> None:
+    """Write the key-mapping report as tab-separated text to the file object ``out``."""
+    out.write("identifier\tkey\tbibitem\tsource\terror\n")
+    for ref, key, error in rows:
+        out.write("\t".join((
+            ref.identifier,
+            key or "",
+            ref.bibitem or "",
+            f"{ref.path}:{ref.line}",
+            error or "",
+        )) + "\n")
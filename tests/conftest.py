@@ -0,0 +1,15 @@
+"""Keep the tests away from the user's cache, index, settings and display."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP = tempfile.mkdtemp(prefix="quickbib-tests-")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(_TMP, "config")
+os.environ["QUICKBIB_CACHE"] = os.path.join(_TMP, "lookups.sqlite3")
+os.environ["QUICKBIB_OFFLINE_INDEX"] = os.path.join(_TMP, "offline.sqlite3")
+os.environ.pop("QUICKBIB_NORMALIZE", None)
+os.environ.pop("QUICKBIB_KEY_FORMAT", None)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
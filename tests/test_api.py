@@ -0,0 +1,28 @@
+import asyncio
+
+from quickbib import api, helpers
+from quickbib.scheduler import scheduler
+
+
+def fake_fetch(identifier):
+    if identifier.endswith("missing"):
+        raise ValueError("not found")
+    return f"@article{{x, doi = {{{identifier}}}}}"
+
+
+def test_async_lookups_run_on_the_shared_scheduler(monkeypatch):
+    monkeypatch.setattr(helpers, "fetch_bibtex", fake_fetch)
+    before = scheduler.wait_stats()
+
+    async def run():
+        one = await api.aresolve("10.5555/api.one")
+        many = [r async for r in api.aresolve_many(["10.5555/api.two", "10.5555/api.missing"], concurrency=2)]
+        return one, many
+
+    one, many = asyncio.run(run())
+
+    assert one.found and "10.5555/api.one" in one.bibtex
+    assert {r.identifier: r.found for r in many} == {"10.5555/api.two": True, "10.5555/api.missing": False}
+    after = scheduler.wait_stats()
+    assert after["interactive"]["count"] == before["interactive"]["count"] + 1
+    assert after["bulk"]["count"] == before["bulk"]["count"] + 2
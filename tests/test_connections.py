@@ -0,0 +1,64 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from quickbib import connections
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, body=b""):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self._reply()
+
+    def do_GET(self):
+        self.wfile.write(self._reply(b"ok"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.connections = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_lookup_reuses_warmed_connection(server):
+    httpd, url = server
+    for t in connections.warm_up([url]):
+        t.join(5)
+    assert httpd.connections == 1
+
+    resp = connections.session.get(url + "/works")
+    assert resp.text == "ok"
+    assert httpd.connections == 1
+
+
+def test_no_warm_up_offline(monkeypatch):
+    started = []
+    monkeypatch.setattr(connections, "warm_up", lambda: started.append(True) or [])
+
+    assert connections.start_warm_up(["quickbib", "--offline"]) == []
+    monkeypatch.setenv("QUICKBIB_OFFLINE", "1")
+    assert connections.start_warm_up(["quickbib"]) == []
+    assert not started
+
+    monkeypatch.delenv("QUICKBIB_OFFLINE")
+    connections.start_warm_up(["quickbib"])
+    assert started
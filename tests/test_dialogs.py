@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtWidgets import QApplication, QWidget  # noqa: E402
+
+from quickbib import main_window  # noqa: E402
+from quickbib.about_dialog import AboutDialog  # noqa: E402
+from quickbib.how_to_use_dialog import HowToUseDialog  # noqa: E402
+
+
+@pytest.fixture
+def window(monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    # exec() would block on a modal dialog
+    monkeypatch.setattr(AboutDialog, "exec", lambda self: 0)
+    monkeypatch.setattr(HowToUseDialog, "exec", lambda self: 0)
+    win = main_window.QuickBibWindow()
+    yield win
+    win.close()
+    win.deleteLater()
+    app.processEvents()
+
+
+def test_help_dialogs_are_built_once(window):
+    window.show_about()
+    window.show_how_to_use()
+    about, how_to_use = window._about_dialog, window._how_to_use_dialog
+    widgets = len(window.findChildren(QWidget))
+
+    window.show_about()
+    window.show_how_to_use()
+
+    assert window._about_dialog is about
+    assert window._how_to_use_dialog is how_to_use
+    assert len(window.findChildren(QWidget)) == widgets
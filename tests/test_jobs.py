@@ -0,0 +1,43 @@
+import json
+
+from quickbib import jobs
+
+
+def _fetch_many(fetched):
+    def fetch_many(ids, max_workers):
+        for ident in ids:
+            fetched.append(ident)
+            yield ident, True, f"@misc{{{ident.replace('/', '_')},\n title = {{{ident}}}\n}}", None
+    return fetch_many
+
+
+def test_resume_after_journal_cut_mid_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", tmp_path / "jobs")
+    fetched = []
+    monkeypatch.setattr(jobs, "fetch_many", _fetch_many(fetched))
+    ids = [f"10.1000/{i}" for i in range(5)]
+
+    jobs.run_job("j", ids, tmp_path / "first.bib")
+    journal = jobs.journal_path("j")
+    # Crash in the middle of writing the last record
+    journal.write_bytes(journal.read_bytes()[:-20])
+    fetched.clear()
+
+    written, failed = jobs.run_job("j", ids, tmp_path / "second.bib")
+
+    assert (written, failed) == (5, [])
+    assert fetched == ["10.1000/4"]
+    assert (tmp_path / "second.bib").read_text() == (tmp_path / "first.bib").read_text()
+    # The cut record is gone and the one fetched again is a line of its own
+    assert [json.loads(line)["id"] for line in journal.read_text().splitlines()] == ids
+
+
+def test_records_missing_fields_are_skipped(tmp_path):
+    journal = tmp_path / "j.jsonl"
+    journal.write_text(
+        '{"id": "10.1000/a", "found": true, "bibtex": "@misc{a,}", "error": null}\n'
+        '{"id": "10.1000/b"}\n'
+        '["not", "a", "record"]\n'
+        '"text"\n'
+    )
+    assert jobs.load_journal(journal) == {"10.1000/a": (True, "@misc{a,}", None)}
@@ -0,0 +1,40 @@
+import pytest
+
+from quickbib import keys
+
+ENTRY = "@article{Smith:2020,\n author = {Smith, Ann},\n title = {{On Things}},\n year = {2020}\n}\n"
+OTHER = "@article{Smith:2020,\n author = {Smith, Bob},\n title = {{Other Things}},\n year = {2020}\n}\n"
+
+
+def test_add_without_format_keeps_keys_and_fixes_collisions(tmp_path):
+    library = tmp_path / "refs.bib"
+    index = tmp_path / "index.sqlite3"
+    assert keys.add_to_library(library, [ENTRY], None, index_path=index) == [("Smith:2020", True)]
+    assert keys.add_to_library(library, [OTHER, ENTRY], None, index_path=index) == [
+        ("Smith:2020a", True), ("Smith:2020", False)]
+    text = library.read_text()
+    assert "@article{Smith:2020," in text and "@article{Smith:2020a," in text
+
+
+def test_add_with_format_generates_keys(tmp_path):
+    library = tmp_path / "refs.bib"
+    assert keys.add_to_library(library, [ENTRY, OTHER], "{author}{year}",
+                               index_path=tmp_path / "index.sqlite3") == [("smith2020", True), ("smith2020a", True)]
+
+
+def test_failed_append_leaves_keys_free(tmp_path, monkeypatch):
+    library = tmp_path / "refs.bib"
+    index = tmp_path / "index.sqlite3"
+    keys.add_to_library(library, [ENTRY], None, index_path=index)
+
+    def disk_full(path, mode="r", *args, **kwargs):
+        if "a" in mode:
+            raise OSError(28, "No space left on device")
+        return open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(keys, "open", disk_full, raising=False)
+    with pytest.raises(OSError):
+        keys.add_to_library(library, [OTHER], None, index_path=index)
+    monkeypatch.undo()
+
+    assert keys.add_to_library(library, [OTHER], None, index_path=index) == [("Smith:2020a", True)]
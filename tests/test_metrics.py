@@ -0,0 +1,47 @@
+import threading
+
+from quickbib.metrics import Metrics
+
+
+def test_shards_of_ended_threads_are_folded_in():
+    m = Metrics()
+
+    def record():
+        m.inc("lookups")
+        m.observe("fetch_seconds", 0.2)
+
+    for _ in range(50):
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    # Each new thread retires the ended ones, so only a handful are ever kept
+    assert len(m._shards) <= 4
+    snap = m.snapshot()
+    assert len(m._shards) == 0
+    assert snap["counters"][("lookups", ())] == 200
+    assert sum(snap["histograms"][("fetch_seconds", ())][:-1]) == 200
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_requests_after_a_failure_count_as_retries(monkeypatch):
+    from quickbib import connections
+
+    statuses = iter([503, 200, 200])
+    monkeypatch.setattr(connections.session, "get", lambda url, **kwargs: _Response(next(statuses)))
+    shim = connections._RequestsShim()
+
+    connections.begin_lookup()
+    # Fails, is retried elsewhere, then a request of the next stage
+    for url in ("http://export.arxiv.org/api", "https://export.arxiv.org/api", "https://doi.org/10.1/x"):
+        shim.get(url)
+    assert connections.lookup_retries() == 1
+
+    connections.begin_lookup()
+    assert connections.lookup_retries() == 0
@@ -0,0 +1,45 @@
+import json
+import os
+import sqlite3
+
+from quickbib import offline_index
+
+WORK = {"DOI": "10.5555/x", "type": "journal-article", "title": ["On Things"], "author": [{"family": "Smith"}]}
+
+
+def _titles(index):
+    with sqlite3.connect(index) as db:
+        return db.execute("SELECT title, doi FROM titles").fetchall()
+
+
+def test_reimporting_a_changed_shard_keeps_one_title_row(tmp_path):
+    shard = tmp_path / "part-0001.jsonl"
+    shard.write_text(json.dumps(WORK) + "\n")
+    index = tmp_path / "offline.sqlite3"
+    offline_index.ingest([shard], index, max_workers=1)
+
+    st = shard.stat()
+    os.utime(shard, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    offline_index.ingest([shard], index, max_workers=1)
+
+    assert _titles(index) == [("on things", "10.5555/x")]
+
+
+def test_old_index_is_migrated_once(tmp_path):
+    index = tmp_path / "offline.sqlite3"
+    with sqlite3.connect(index) as db:
+        db.executescript("""
+            CREATE TABLE works (doi TEXT PRIMARY KEY, bibtex TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE titles (title TEXT NOT NULL, doi TEXT NOT NULL);
+            CREATE INDEX titles_title ON titles (title);
+            CREATE TABLE shards (name TEXT PRIMARY KEY);
+            INSERT INTO titles VALUES ('on things', '10.5555/x'), ('on things', '10.5555/x');
+        """)
+
+    offline_index.ingest([], index)
+
+    with sqlite3.connect(index) as db:
+        tables = {name for (name,) in db.execute("SELECT name FROM sqlite_master")}
+        assert db.execute("PRAGMA user_version").fetchone()[0] == len(offline_index._MIGRATIONS)
+    assert "shards" not in tables and "titles_title" not in tables
+    assert _titles(index) == [("on things", "10.5555/x")]
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from quickbib.scheduler import BULK, INTERACTIVE, FetchScheduler
+
+LATENCY = 0.1
+
+
+class StubBackend:
+    """Sleeps like a network lookup and records how many run at once."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, identifier, interactive=False):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(LATENCY)
+        with self._lock:
+            self.running -= 1
+        return True, f"@article{{{identifier}}}", None
+
+
+def test_interactive_job_skips_bulk_backlog():
+    backend = StubBackend()
+    sched = FetchScheduler(workers=4, reserved=1, fetch=backend)
+    try:
+        # Leaves one idle thread behind, which must not hold the pool at one
+        sched.submit("warm-up", INTERACTIVE).result()
+
+        started = time.monotonic()
+        bulk = [sched.submit(f"bulk-{i}", BULK) for i in range(16)]
+        time.sleep(LATENCY / 2)
+        interactive = sched.submit("user", INTERACTIVE)
+        assert interactive.result()[0]
+        for f in bulk:
+            assert f.result()[0]
+        elapsed = time.monotonic() - started
+
+        stats = sched.wait_stats()
+        # Started on the reserved thread, not behind the 16 queued jobs
+        assert stats["interactive"]["max"] < LATENCY / 2
+        assert stats["bulk"]["count"] == 16
+        # The backlog ran at full background concurrency: 4 rounds of 4
+        assert backend.peak == 5
+        assert elapsed < 16 * LATENCY / 4 * 2
+    finally:
+        sched.shutdown()
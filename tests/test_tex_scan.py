@@ -0,0 +1,12 @@
+from quickbib.tex_scan import scan_tex
+
+
+def test_doi_case_variants_are_one_reference(tmp_path):
+    (tmp_path / "chapter.tex").write_text("Again \\cite{x} 10.1000/ABC.\n")
+    main = tmp_path / "main.tex"
+    main.write_text("See doi:10.1000/abc.\n\\input{chapter}\n")
+
+    refs = list(scan_tex(str(main)))
+
+    assert [r.identifier for r in refs] == ["10.1000/abc"]
+    assert refs[0].line == 1
@@ -13,13 +13,28 @@ Limitations:
   not include all retina variants and won't replace a properly produced
   icns created by `iconutil` on macOS for final release.
 
-Output: `assets/icon/QuickBib.icns`
+When the scalable SVG and Inkscape are available, all sizes are rendered
+from the SVG in parallel, and the ICNS, a Windows ICO and the hicolor PNG
+set (`assets/icon/<size>/`) are all written from that one pass. The ICO
+holds PNG entries only, which older Windows shells and some resource tools
+cannot read, so it goes to `build/icons/` and never replaces the committed
+ICO used by the installer. Renders are
+cached in `.icon_cache/` by SVG content hash and pixel size, so a release
+build with an unchanged SVG runs no Inkscape at all. Files are only written
+when their bytes change, and entries are packed in a fixed order, so the
+same SVG always gives byte-identical icons.
+
+Output: `assets/icon/QuickBib.icns`, the PNGs in `assets/icon/<size>/` and
+`build/icons/io.github.archisman_panigrahi.QuickBib.ico`
 """
 from __future__ import annotations
 
+import hashlib
+import os
 import struct
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable
 import shutil
 import subprocess
 import sys
@@ -27,6 +42,13 @@ import sys
 ROOT = Path(__file__).resolve().parents[1]
 ICONS_DIR = ROOT / "assets" / "icon"
 OUT_ICNS = ICONS_DIR / "QuickBib.icns"
+APP_ID = "io.github.archisman_panigrahi.QuickBib"
+# Build output only: the committed ICO in assets/icon/64x64/ is left alone
+OUT_ICO = ROOT / "build" / "icons" / (APP_ID + ".ico")
+CACHE_DIR = ROOT / ".icon_cache"
+
+# Sizes packed into the Windows .ico, smallest first
+ICO_SIZES = (16, 32, 64, 128)
 
 # Map folder names (or sizes) to icns type codes. This is a pragmatic mapping
 # that covers common icon sizes. The type codes expect PNG data for modern
@@ -68,64 +90,106 @@ def _try_run(cmd: list[str]) -> bool:
         return False
 
 
-def render_svg_to_pngs(svg: Path) -> None:
-    """Render the provided SVG into PNG files for the sizes defined in MAPPING.
+def _size_of(key: str) -> int:
+    return int(key.split("x")[0])
+
+
+def svg_digest(svg: Path) -> str:
+    return hashlib.sha256(svg.read_bytes()).hexdigest()
+
+
+def _render_one(svg: Path, size: int, out_png: Path) -> None:
+    # Try modern inkscape CLI (1.0+): `inkscape input.svg --export-type=png --export-filename=out.png --export-width=Wx --export-height=Hx`
+    modern_cmd = [
+        "inkscape",
+        str(svg),
+        "--export-type=png",
+        f"--export-filename={str(out_png)}",
+        f"--export-width={size}",
+        f"--export-height={size}",
+    ]
+
+    # Legacy CLI: `inkscape -z -e out.png -w W -h H input.svg`
+    legacy_cmd = [
+        "inkscape",
+        "-z",
+        "-e",
+        str(out_png),
+        "-w",
+        str(size),
+        "-h",
+        str(size),
+        str(svg),
+    ]
+
+    ok = _try_run(modern_cmd)
+    if not ok:
+        ok = _try_run(legacy_cmd)
 
-    This will create/overwrite files at assets/icon/<size>/<svgname>.png.
-    The function attempts to use the modern Inkscape CLI first and falls back
-    to the legacy CLI form when needed.
+    if not ok or not out_png.exists():
+        # If rendering failed, surface a helpful error and abort.
+        raise RuntimeError(
+            f"Failed to render SVG to PNG for size {size}. Tried inkscape commands."
+        )
+
+
+def render_cached(svg: Path, sizes: Iterable[int]) -> Dict[int, Path]:
+    """Render ``svg`` at each pixel size, reusing earlier renders of the same SVG.
+
+    Renders live in CACHE_DIR/<sha256 of the SVG>/<size>.png; the missing
+    ones are rendered in parallel. Returns {size: path of the cached PNG}.
     """
+    cache = CACHE_DIR / svg_digest(svg)
+    cache.mkdir(parents=True, exist_ok=True)
+    rendered = {size: cache / f"{size}.png" for size in sorted(set(sizes))}
+    missing = [size for size, png in rendered.items() if not png.exists()]
+    if not missing:
+        print(f"All {len(rendered)} sizes of {svg.name} are cached; skipping Inkscape")
+        return rendered
+
     if not inkscape_available():
         raise RuntimeError("Inkscape not found on PATH. Install Inkscape to render SVG to PNG.")
 
-    svg_name = svg.name
-    # for each mapping key like '16x16', render that pixel size
-    for key in MAPPING.keys():
-        try:
-            size = int(key.split("x")[0])
-        except Exception:
-            print(f"Skipping invalid size key: {key}")
-            continue
-
-        out_dir = ICONS_DIR / key
-        out_dir.mkdir(parents=True, exist_ok=True)
-        out_png = out_dir / (svg_name.rsplit('.', 1)[0] + ".png")
-
-        # Try modern inkscape CLI (1.0+): `inkscape input.svg --export-type=png --export-filename=out.png --export-width=Wx --export-height=Hx`
-        modern_cmd = [
-            "inkscape",
-            str(svg),
-            "--export-type=png",
-            f"--export-filename={str(out_png)}",
-            f"--export-width={size}",
-            f"--export-height={size}",
-        ]
-
-        # Legacy CLI: `inkscape -z -e out.png -w W -h H input.svg`
-        legacy_cmd = [
-            "inkscape",
-            "-z",
-            "-e",
-            str(out_png),
-            "-w",
-            str(size),
-            "-h",
-            str(size),
-            str(svg),
-        ]
-
-        print(f"Rendering SVG {svg} -> {out_png} at {size}x{size}")
-        ok = _try_run(modern_cmd)
-        if not ok:
-            ok = _try_run(legacy_cmd)
-
-        if not ok:
-            # If rendering failed, surface a helpful error and abort.
-            raise RuntimeError(
-                f"Failed to render SVG to PNG for size {size}. Tried inkscape commands."
-            )
+    def render(size: int) -> None:
+        # Render next to the cache entry and move it in, so an interrupted
+        # run never leaves a truncated PNG that looks cached
+        partial = cache / f"{size}.partial.png"
+        _render_one(svg, size, partial)
+        os.replace(partial, rendered[size])
+
+    print(f"Rendering {svg.name} at {', '.join(map(str, missing))} px with Inkscape...")
+    with ThreadPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as pool:
+        # list() re-raises the first failure
+        list(pool.map(render, missing))
+    return rendered
 
 
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Write ``data`` unless ``path`` already holds exactly these bytes."""
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+def render_svg_to_pngs(svg: Path) -> Dict[int, Path]:
+    """Render the provided SVG for the hicolor sizes in MAPPING and the ICO.
+
+    This will create/update files at assets/icon/<size>/<svgname>.png (only
+    those whose bytes change) and returns {size: rendered PNG} for every
+    size, so the ICNS and ICO can be packed from the same renders.
+    """
+    sizes = {_size_of(key) for key in MAPPING} | set(ICO_SIZES)
+    rendered = render_cached(svg, sizes)
+
+    png_name = svg.name.rsplit('.', 1)[0] + ".png"
+    for key in MAPPING:
+        out_png = ICONS_DIR / key / png_name
+        if write_if_changed(out_png, rendered[_size_of(key)].read_bytes()):
+            print(f"Updated {out_png}")
+    return rendered
+
 
 def find_pngs() -> Dict[str, Path]:
     found = {}
@@ -143,6 +207,27 @@ def find_pngs() -> Dict[str, Path]:
     return found
 
 
+def png_size(data: bytes) -> int:
+    """Width of a PNG, read from its IHDR chunk."""
+    return struct.unpack(">I", data[16:20])[0]
+
+
+def build_ico(images: Iterable[bytes]) -> bytes:
+    """Pack PNG images into a .ico (PNG entries, as Windows Vista and later read them)."""
+    images = sorted(images, key=png_size)
+    out = bytearray(struct.pack("<HHH", 0, 1, len(images)))
+    offset = 6 + 16 * len(images)
+    for data in images:
+        size = png_size(data)
+        # A width or height of 256 is stored as 0
+        dim = 0 if size >= 256 else size
+        out += struct.pack("<BBBBHHII", dim, dim, 0, 0, 1, 32, len(data), offset)
+        offset += len(data)
+    for data in images:
+        out += data
+    return bytes(out)
+
+
 def build_icns(entries: Dict[str, bytes]) -> bytes:
     # ICNS header 'icns' + total length (8 + sum(entry lengths))
     parts = []
@@ -168,10 +253,11 @@ def main():
     # If an SVG exists, try to render PNGs from it first. If inkscape is not
     # available, we fall back to existing PNGs if present.
     svg = find_svg()
+    rendered: Dict[int, Path] = {}
     if svg is not None:
         try:
-            print(f"Found SVG: {svg}. Attempting to render PNGs using Inkscape...")
-            render_svg_to_pngs(svg)
+            print(f"Found SVG: {svg}. Rendering PNGs (cached by SVG content)...")
+            rendered = render_svg_to_pngs(svg)
         except RuntimeError as exc:
             print("SVG rendering failed:", exc)
             print("Proceeding to look for existing PNGs (if any)...")
@@ -181,6 +267,7 @@ def main():
         print("No PNG icon sources found in assets/icon/* folders and no SVG rendering available. Nothing to do.")
         return
 
+    # Entries in MAPPING order, so the same PNGs always give the same bytes
     entries = {}
     for typ, p in pngs.items():
         print(f"Adding {p} as icns type {typ}")
@@ -188,8 +275,18 @@ def main():
 
     icns_data = build_icns(entries)
     ICONS_DIR.mkdir(parents=True, exist_ok=True)
-    OUT_ICNS.write_bytes(icns_data)
-    print("Wrote:", OUT_ICNS)
+    if write_if_changed(OUT_ICNS, icns_data):
+        print("Wrote:", OUT_ICNS)
+    else:
+        print("Unchanged:", OUT_ICNS)
+
+    # The ICO needs the renders; without them the existing one is kept
+    if rendered:
+        ico_data = build_ico(rendered[size].read_bytes() for size in ICO_SIZES)
+        if write_if_changed(OUT_ICO, ico_data):
+            print("Wrote:", OUT_ICO)
+        else:
+            print("Unchanged:", OUT_ICO)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@
 
 This imports the package entrypoint and calls main(argv).
 """
+import multiprocessing
 import sys
 import os
 
@@ -17,6 +18,9 @@ from quickbib.quickbib import main
 
 
 def _entry():
+    # The PDF folder scanner uses a process pool; frozen builds need this so
+    # the spawned workers do not start another copy of the GUI.
+    multiprocessing.freeze_support()
     sys.exit(main(sys.argv))
 
 
@@ -6,6 +6,7 @@ build-time tweaks (paths, icons, etc.). It ensures the repository root is on
 sys.path so the `quickbib` package is importable when the launcher is executed
 from the `windows_packaging` directory.
 """
+import multiprocessing
 import sys
 import os
 
@@ -20,6 +21,9 @@ from quickbib.quickbib import main
 
 
 def _entry():
+    # The PDF folder scanner uses a process pool; frozen builds need this so
+    # the spawned workers do not start another copy of the GUI.
+    multiprocessing.freeze_support()
     # call the package entrypoint and exit with return code
     sys.exit(main(sys.argv))
 
@@ -23,11 +23,29 @@ from pathlib import Path
 import plistlib
 import argparse
 
+# The icon pipeline lives next to this script
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import generate_icns_from_pngs as icon_pipeline  # noqa: E402
+
 ROOT = Path(__file__).resolve().parents[1]
 VENV_DIR = ROOT / ".venv_macos_build"
 DIST_DIR = ROOT / "dist"
 BUILD_NAME = "QuickBib"
 
+# iconutil's iconset file names and their pixel sizes
+ICONSET = {
+    "icon_16x16.png": 16,
+    "icon_16x16@2x.png": 32,
+    "icon_32x32.png": 32,
+    "icon_32x32@2x.png": 64,
+    "icon_128x128.png": 128,
+    "icon_128x128@2x.png": 256,
+    "icon_256x256.png": 256,
+    "icon_256x256@2x.png": 512,
+    "icon_512x512.png": 512,
+    "icon_512x512@2x.png": 1024,
+}
+
 
 def run(cmd, **kwargs):
     print("$", " ".join(cmd))
@@ -77,34 +95,50 @@ def _find_or_make_icns() -> Path | None:
     if shutil.which("iconutil") is None:
         return None
 
-    # Map available PNG folders to iconset filenames
-    mapping = {
-        "16x16": "icon_16x16.png",
-        "32x32": "icon_32x32.png",
-        "64x64": "icon_64x64.png",
-        "128x128": "icon_128x128.png",
-    }
-
-    with tempfile.TemporaryDirectory() as tmp:
-        iconset = Path(tmp) / (BUILD_NAME + ".iconset")
-        iconset.mkdir()
-
-        found_any = False
+    # The full iconset, retina variants included, rendered from the SVG
+    # through the shared icon cache; an unchanged SVG reuses the last .icns.
+    cached_icns = None
+    pngs = {}
+    svg = icon_pipeline.find_svg()
+    if svg is not None:
+        try:
+            rendered = icon_pipeline.render_cached(svg, set(ICONSET.values()))
+            pngs = {name: rendered[size] for name, size in ICONSET.items()}
+            cached_icns = rendered[ICONSET["icon_16x16.png"]].parent / (BUILD_NAME + ".icns")
+        except RuntimeError as exc:
+            print("SVG rendering failed:", exc)
+
+    if not pngs:
+        # Map available PNG folders to iconset filenames
+        mapping = {
+            "16x16": "icon_16x16.png",
+            "32x32": "icon_32x32.png",
+            "64x64": "icon_64x64.png",
+            "128x128": "icon_128x128.png",
+        }
         for folder_name, icon_name in mapping.items():
             src_dir = icons_dir / folder_name
             if src_dir.exists():
                 # pick the first png inside
                 png = next(src_dir.glob("*.png"), None)
                 if png:
-                    dest = iconset / icon_name
-                    shutil.copyfile(png, dest)
-                    found_any = True
+                    pngs[icon_name] = png
                     # if we have a 64x64, make it 32x32@2x which iconutil understands
                     if folder_name == "64x64":
-                        (iconset / "icon_32x32@2x.png").write_bytes(dest.read_bytes())
+                        pngs["icon_32x32@2x.png"] = png
 
-        if not found_any:
-            return None
+    if not pngs:
+        return None
+
+    if cached_icns is not None and cached_icns.exists():
+        print("Using cached icon:", cached_icns)
+        return _persist_icns(cached_icns)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        iconset = Path(tmp) / (BUILD_NAME + ".iconset")
+        iconset.mkdir()
+        for icon_name, png in pngs.items():
+            shutil.copyfile(png, iconset / icon_name)
 
         out_icns = Path(tmp) / (BUILD_NAME + ".icns")
         try:
@@ -113,16 +147,22 @@ def _find_or_make_icns() -> Path | None:
             return None
 
         if out_icns.exists():
+            if cached_icns is not None:
+                shutil.copyfile(out_icns, cached_icns)
             # move to a persistent location inside dist_artifacts for reproducibility
-            out_dir = ROOT / "dist_artifacts"
-            out_dir.mkdir(parents=True, exist_ok=True)
-            persistent = out_dir / out_icns.name
-            shutil.copyfile(out_icns, persistent)
-            return persistent
+            return _persist_icns(out_icns)
 
     return None
 
 
+def _persist_icns(icns: Path) -> Path:
+    out_dir = ROOT / "dist_artifacts"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    persistent = out_dir / (BUILD_NAME + ".icns")
+    shutil.copyfile(icns, persistent)
+    return persistent
+
+
 def build_app():
     # Ensure clean build
     if (ROOT / "build").exists():
@@ -154,6 +194,11 @@ def build_app():
         # PyInstaller expects --add-data in the format source:dest
         cmd += ["--add-data", f"{assets}{os.pathsep}assets"]
 
+    # Prebuilt journal abbreviation index used by quickbib.normalize
+    data = ROOT / "quickbib" / "data"
+    if data.exists():
+        cmd += ["--add-data", f"{data}{os.pathsep}quickbib/data"]
+
     run(cmd)
 
 